@@ -0,0 +1,273 @@
+# ai/backends.py
+
+import contextvars
+import threading
+from abc import ABC, abstractmethod
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List
+from config.settings import (AI_BACKEND, AI_REQUEST_TIMEOUT_SECONDS, AI_CONCURRENT_MODE, AI_HEDGE_DELAY_SECONDS,
+                             AI_LOCAL_MODEL_PATH, AI_LOCAL_MAX_NEW_TOKENS, AI_LOCAL_MAX_INPUT_TOKENS,
+                             AI_LOCAL_BATCHING)
+from services.deadlines import remaining as time_remaining
+from services.telemetry import span
+
+# Sampling settings shared by every backend
+GENERATION_PARAMETERS = {"temperature": 0.8, "do_sample": True, "top_p": 0.9}
+MIN_RESPONSE_CHARS = 50  # Anything shorter is treated as a failed generation
+
+
+class InferenceBackend(ABC):
+    """Something that turns a prompt into generated text"""
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        """Return generated text (without the prompt), or "" if generation failed"""
+
+    def generate_batch(self, prompts: List[str], max_tokens: int) -> List[str]:
+        """Generate for several prompts; backends that can pad and batch override this"""
+        return [self.generate(prompt, max_tokens) for prompt in prompts]
+
+    def describe(self) -> Dict[str, Any]:
+        """Settings that change the output, used to key cached responses"""
+        return {"backend": self.name}
+
+
+class RemoteInferenceBackend(InferenceBackend):
+    """HuggingFace inference API models, with hedged requests and per-endpoint health"""
+
+    name = "remote"
+
+    DEFAULT_MODELS = [
+        "https://api-inference.huggingface.co/models/microsoft/DialoGPT-large",
+        "https://api-inference.huggingface.co/models/facebook/blenderbot-400M-distill",
+        "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
+    ]
+
+    def __init__(self, ai_models: List[str] = None, hedged: bool = AI_CONCURRENT_MODE,
+                 hedge_delay: float = AI_HEDGE_DELAY_SECONDS, session=None, health=None):
+        # Imported here so the local backend works without the HTTP stack
+        from services.http_pool import get_http_session, get_health_registry
+
+        self.ai_models = ai_models or list(self.DEFAULT_MODELS)
+        self.hedged = hedged
+        self.hedge_delay = hedge_delay
+        self.session = session or get_http_session()
+        self.health = health or get_health_registry()
+        self.headers = {"Content-Type": "application/json"}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "models": self.ai_models}
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        """Try the healthy models, hedged or one after another, and return the first valid response"""
+        payload = {
+            "inputs": prompt,
+            "parameters": {"max_new_tokens": max_tokens, **GENERATION_PARAMETERS}
+        }
+
+        models = self.health.ordered(self.ai_models)
+        if self.hedged:
+            return self._call_models_hedged(models, prompt, payload)
+
+        for model_url in models:
+            ai_text = self._request_model(model_url, prompt, payload)
+            if ai_text:
+                return ai_text
+
+        return ""
+
+    def _request_model(self, model_url: str, prompt: str, payload: Dict) -> str:
+        """Query a single model, returning its cleaned text or "" on any failure"""
+        timeout = AI_REQUEST_TIMEOUT_SECONDS
+        left = time_remaining()
+        if left is not None:
+            if left <= 0:
+                return ""  # The caller has stopped waiting
+            timeout = min(timeout, left)
+
+        health = self.health.get(model_url)
+        if not health.acquire():
+            return ""  # Circuit open, or another request is already probing this endpoint
+
+        with span("model_attempt", model=model_url) as attempt:
+            start = time.monotonic()
+            try:
+                response = self.session.post(model_url, headers=self.headers, json=payload,
+                                             timeout=timeout)
+            except Exception as e:
+                from requests.exceptions import Timeout
+                if isinstance(e, Timeout) and timeout < AI_REQUEST_TIMEOUT_SECONDS:
+                    # Cut short by the request deadline, which says nothing about the endpoint
+                    health.release()
+                    attempt.outcome = "deadline"
+                    return ""
+                health.record_failure(time.monotonic() - start)
+                attempt.outcome = "timeout" if isinstance(e, Timeout) else "error"
+                return ""
+
+            if response.status_code != 200:
+                health.record_failure(time.monotonic() - start)
+                attempt.outcome = "http_error"
+                return ""
+            health.record_success(time.monotonic() - start)
+
+            attempt.outcome = "short_response"
+            try:
+                result = response.json()
+                if isinstance(result, list) and len(result) > 0:
+                    ai_text = result[0].get('generated_text', '')
+                    # Clean up the response
+                    ai_text = ai_text.replace(prompt, '').strip()
+                    if len(ai_text) > MIN_RESPONSE_CHARS:  # Valid response
+                        attempt.outcome = "success"
+                        return ai_text
+            except Exception:
+                attempt.outcome = "bad_response"
+
+            return ""
+
+    def _call_models_hedged(self, models: List[str], prompt: str, payload: Dict) -> str:
+        """Race the models with hedged requests and return the first valid response.
+
+        The first model starts immediately; each further model is started when the
+        previous ones fail or after ``hedge_delay`` seconds without an answer.
+        """
+        remaining = list(models)
+        if not remaining:
+            return ""
+
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=len(remaining), thread_name_prefix="ai-hedge")
+
+        try:
+            while remaining or pending:
+                if remaining:
+                    pending.add(executor.submit(contextvars.copy_context().run, self._request_model,
+                                                remaining.pop(0), prompt, payload))
+
+                # Once every model is in flight, just wait for the next one to finish (or the deadline)
+                left = time_remaining()
+                if left is not None and left <= 0:
+                    break
+                timeout = self.hedge_delay if remaining else left
+                if remaining and left is not None:
+                    timeout = min(timeout, left)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ai_text = future.result()
+                    if ai_text:
+                        return ai_text
+        finally:
+            # Drop the slower requests; their results are discarded when they finish
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return ""
+
+
+_local_models: Dict[str, Any] = {}
+_local_models_lock = threading.Lock()
+
+
+def load_local_model(model_path: str):
+    """Load a causal LM and its tokenizer once per process; later calls reuse the same objects"""
+    with _local_models_lock:
+        if model_path not in _local_models:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            # Decoder-only models must be left-padded so every row continues from its own prompt
+            tokenizer.padding_side = "left"
+            model = AutoModelForCausalLM.from_pretrained(model_path, local_files_only=True,
+                                                         torch_dtype=torch.float32)
+            model.to("cpu")
+            model.eval()
+            _local_models[model_path] = (tokenizer, model)
+        return _local_models[model_path]
+
+
+class LocalInferenceBackend(InferenceBackend):
+    """In-process CPU generation with a transformers causal LM from a local directory"""
+
+    name = "local"
+
+    def __init__(self, model_path: str = AI_LOCAL_MODEL_PATH, max_new_tokens: int = AI_LOCAL_MAX_NEW_TOKENS,
+                 max_input_tokens: int = AI_LOCAL_MAX_INPUT_TOKENS):
+        self.model_path = model_path
+        self.max_new_tokens = max_new_tokens
+        self.max_input_tokens = max_input_tokens
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model_path": self.model_path, "max_new_tokens": self.max_new_tokens}
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        return self.generate_batch([prompt], max_tokens)[0]
+
+    def generate_batch(self, prompts: List[str], max_tokens: int) -> List[str]:
+        with span("model_attempt", model="local") as attempt:
+            try:
+                import torch
+                tokenizer, model = load_local_model(self.model_path)
+            except Exception:
+                attempt.outcome = "error"
+                # torch, transformers or the model missing: behave like an unavailable remote model
+                return [""] * len(prompts)
+
+            try:
+                inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                                   max_length=self.max_input_tokens)
+                with torch.inference_mode():
+                    output = model.generate(
+                        **inputs,
+                        max_new_tokens=min(max_tokens, self.max_new_tokens),
+                        use_cache=True,
+                        pad_token_id=tokenizer.pad_token_id,
+                        **GENERATION_PARAMETERS
+                    )
+
+                # Decode only the newly generated tokens, not the echoed (padded) prompt
+                prompt_length = inputs["input_ids"].shape[1]
+                texts = tokenizer.batch_decode(output[:, prompt_length:], skip_special_tokens=True)
+            except Exception:
+                attempt.outcome = "error"
+            else:
+                texts = [text.strip() if len(text.strip()) > MIN_RESPONSE_CHARS else "" for text in texts]
+                if not all(texts):
+                    attempt.outcome = "short_response"
+                return texts
+
+        if len(prompts) == 1:
+            return [""]
+        # One prompt may have broken the batch: retry each on its own, so only that one fails
+        return [self.generate_batch([prompt], max_tokens)[0] for prompt in prompts]
+
+
+def create_backend(name: str = AI_BACKEND) -> InferenceBackend:
+    """Build the backend selected in settings (or by name)"""
+    if name == "local":
+        return LocalInferenceBackend()
+    if name == "remote":
+        return RemoteInferenceBackend()
+    raise ValueError(f"Unknown AI backend: {name}")
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_backend() -> InferenceBackend:
+    """Process-wide backend shared by every advisor, so local batches span all sessions"""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            backend = create_backend()
+            if backend.name == "local" and AI_LOCAL_BATCHING:
+                from ai.batching import BatchingBackend
+                backend = BatchingBackend(backend)
+            _default_backend = backend
+        return _default_backend
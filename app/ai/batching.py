@@ -0,0 +1,93 @@
+# ai/batching.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List
+from ai.backends import InferenceBackend
+from config.settings import AI_BATCH_MAX_SIZE, AI_BATCH_MAX_WAIT_SECONDS
+
+
+class _Request:
+    def __init__(self, prompt: str, max_tokens: int):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.future = Future()
+
+
+class BatchingBackend(InferenceBackend):
+    """Queue prompts from every session and run them through the inner backend as batches.
+
+    A batch is dispatched when it reaches ``max_batch_size`` or when its oldest prompt has
+    waited ``max_wait_seconds``; each result is routed back to the caller that submitted it.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch_size: int = AI_BATCH_MAX_SIZE,
+                 max_wait_seconds: float = AI_BATCH_MAX_WAIT_SECONDS):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def describe(self) -> Dict[str, Any]:
+        return self.backend.describe()
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        return self.submit(prompt, max_tokens).result()
+
+    def generate_batch(self, prompts: List[str], max_tokens: int) -> List[str]:
+        futures = [self.submit(prompt, max_tokens) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def submit(self, prompt: str, max_tokens: int) -> Future:
+        self._ensure_worker()
+        request = _Request(prompt, max_tokens)
+        self._queue.put(request)
+        return request.future
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ai-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+
+            # Prompts asking for different lengths go through the model separately
+            groups: Dict[int, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.max_tokens, []).append(request)
+
+            for max_tokens, group in groups.items():
+                try:
+                    results = self.backend.generate_batch([r.prompt for r in group], max_tokens)
+                    if len(results) != len(group):
+                        raise RuntimeError(f"{self.name} backend returned {len(results)} results "
+                                           f"for {len(group)} prompts")
+                except Exception as e:
+                    # Every caller in the group must be woken, or it would wait forever
+                    for request in group:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                for request, result in zip(group, results):
+                    request.future.set_result(result)
@@ -0,0 +1,483 @@
+# api_server.py
+"""Headless JSON API for scoring, rules, AI recommendations and PDF reports.
+
+Run from the app directory, separately from the Streamlit app:
+
+    python api_server.py --port 8080 --workers 4
+
+Endpoints (JSON in, JSON out unless noted):
+
+    GET  /health
+    GET  /metrics                   Prometheus text format (per worker process)
+    POST /v1/score                  {"user_data": {...}, "user_id": optional, "history": optional}
+    POST /v1/score/batch            {"profiles": [{...}, ...]}
+    POST /v1/recommendation         {"user_data": {...}, "user_id": optional, "history": optional}
+    POST /v1/report                 same body, plus optional "ai_recommendation"; returns application/pdf
+
+With a ``user_id`` the snapshot is saved and the trend comes from the user's stored
+history, as in the app; otherwise an optional newest-first ``history`` list of
+{"timestamp", "loan_amount"} is used. Each worker is a single-threaded asyncio loop;
+blocking work (model calls, SQLite, PDF rendering) runs on a bounded thread pool so
+the loop keeps serving. Requests past their deadline get 504; the deadline follows
+their blocking work, which is skipped if still queued and caps model timeouts. A
+worker at API_MAX_IN_FLIGHT, counting timed-out requests whose blocking work has not
+finished, answers 503 with Retry-After instead of queueing without bound.
+Workers share the port with SO_REUSEPORT, so the kernel spreads connections.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import multiprocessing
+import signal
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+
+from config.settings import (API_HOST, API_PORT, API_WORKERS, API_MAX_IN_FLIGHT, API_BLOCKING_THREADS,
+                             API_REQUEST_TIMEOUT_SECONDS, API_MAX_BODY_BYTES, API_MAX_BATCH_SIZE,
+                             API_MAX_HEADERS, API_MAX_HEADER_BYTES, CHART_HISTORY_LIMIT)
+from services.deadlines import DeadlineExceeded, check as check_deadline, deadline
+from services.telemetry import span, trace, render_metrics
+
+logger = logging.getLogger("credai.api")
+
+NUMERIC_FIELDS = ("income", "expenses", "loan_amount", "credit_util", "missed_payments")
+# Optional profile fields; when absent, scoring uses age 30 and no job stability or bank
+OPTIONAL_NUMERIC_FIELDS = ("age",)
+OPTIONAL_TEXT_FIELDS = ("job_stability", "primary_bank")
+
+# Executor futures started for the current request; its in-flight slot is held until they finish
+_request_work: contextvars.ContextVar = contextvars.ContextVar("credai_request_work", default=None)
+
+
+class ApiError(Exception):
+    """Turned into a JSON error response with the given status"""
+
+    def __init__(self, status: int, message: str, headers: Dict[str, str] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# ---------------- Request validation ----------------
+
+def _user_data(body: Dict[str, Any]) -> Dict[str, Any]:
+    user_data = body.get("user_data")
+    if not isinstance(user_data, dict):
+        raise ApiError(400, "user_data must be an object")
+    _check_profile(user_data)
+    return user_data
+
+
+def _check_profile(user_data: Dict[str, Any], where: str = "user_data"):
+    for field in NUMERIC_FIELDS:
+        value = user_data.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ApiError(400, f"{where}.{field} must be a finite number")
+        if value < 0:
+            raise ApiError(400, f"{where}.{field} must not be negative")
+    for field in OPTIONAL_NUMERIC_FIELDS:
+        if field in user_data:
+            value = user_data[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ApiError(400, f"{where}.{field} must be a finite number")
+            if value < 0:
+                raise ApiError(400, f"{where}.{field} must not be negative")
+    for field in OPTIONAL_TEXT_FIELDS:
+        if user_data.get(field) is not None and not isinstance(user_data[field], str):
+            raise ApiError(400, f"{where}.{field} must be a string")
+
+
+def _history(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    history = body.get("history") or []
+    if not isinstance(history, list):
+        raise ApiError(400, "history must be a list of objects with timestamp and loan_amount")
+    for i, row in enumerate(history):
+        if not isinstance(row, dict):
+            raise ApiError(400, f"history[{i}] must be an object")
+        timestamp = row.get("timestamp")
+        try:
+            datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"history[{i}].timestamp must be an ISO 8601 string")
+        loan_amount = row.get("loan_amount")
+        if isinstance(loan_amount, bool) or not isinstance(loan_amount, (int, float)) \
+                or not math.isfinite(loan_amount):
+            raise ApiError(400, f"history[{i}].loan_amount must be a finite number")
+    return history
+
+
+# ---------------- Handlers ----------------
+
+class CreditApi:
+    """Request handlers for one worker process"""
+
+    def __init__(self, blocking_threads: int = API_BLOCKING_THREADS):
+        self.executor = ThreadPoolExecutor(max_workers=blocking_threads, thread_name_prefix="api-blocking")
+        self._advisor = None
+
+    @property
+    def advisor(self):
+        if self._advisor is None:
+            from services.credit_score import AIFinancialAdvisor
+            self._advisor = AIFinancialAdvisor()
+        return self._advisor
+
+    async def blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on the worker's bounded pool without stalling the event loop.
+
+        The request's deadline travels with the context: work still queued when it
+        passes is skipped, and model calls cap their timeouts by what is left.
+        """
+        context = contextvars.copy_context()
+        future = self.executor.submit(context.run, _before_deadline, fn, *args, **kwargs)
+        work = _request_work.get()
+        if work is not None:
+            work.append(future)
+        return await asyncio.wrap_future(future)
+
+    def _score(self, user_data, history, user_id=None) -> Tuple[int, str, Dict, List]:
+        from services.credit_score import calculate_financial_health
+
+        summary = None
+        if user_id is not None:
+            from db import save_user_data, get_user_history, get_user_summary, get_user_trend
+            save_user_data(str(user_id), user_data)
+            summary = get_user_summary(str(user_id))
+            history = [dict(row) for row in get_user_history(str(user_id), limit=CHART_HISTORY_LIMIT,
+                                                             columns=("timestamp", "loan_amount"))]
+        credit_score, trend, financial_health = calculate_financial_health(user_data, history, summary)
+        if user_id is not None:
+            financial_health["trends"] = get_user_trend(str(user_id))
+        return credit_score, trend, financial_health, history
+
+    async def score(self, body):
+        from rules.engine import evaluate_credit_profile
+        from services.peer_rank import peer_percentiles
+
+        user_data = _user_data(body)
+        user_id = body.get("user_id")
+        if user_id is None:
+            credit_score, trend, financial_health, _ = self._score(user_data, _history(body))  # Microseconds: inline
+        else:
+            credit_score, trend, financial_health, _ = await self.blocking(self._score, user_data, [], user_id)
+        peer_ranks = await self.blocking(peer_percentiles, user_data, credit_score, financial_health["health_score"])
+        return {
+            "credit_score": credit_score,
+            "trend": trend,
+            "financial_health": financial_health,
+            "rules": evaluate_credit_profile(user_data, credit_score),
+            "peer_ranks": peer_ranks,
+        }
+
+    async def score_batch(self, body):
+        profiles = body.get("profiles")
+        if not isinstance(profiles, list) or not profiles:
+            raise ApiError(400, "profiles must be a non-empty list")
+        if len(profiles) > API_MAX_BATCH_SIZE:
+            raise ApiError(413, f"At most {API_MAX_BATCH_SIZE} profiles per batch")
+        for i, profile in enumerate(profiles):
+            if not isinstance(profile, dict):
+                raise ApiError(400, f"profiles[{i}] must be an object")
+            _check_profile(profile, f"profiles[{i}]")
+        return {"results": await self.blocking(_score_batch, profiles)}
+
+    async def recommendation(self, body):
+        from services.credit_score import get_ai_recommendation
+
+        user_data = _user_data(body)
+        credit_score, trend, financial_health, history = await self.blocking(
+            self._score, user_data, _history(body), body.get("user_id"))
+        ai_recommendation = await self.blocking(get_ai_recommendation, credit_score, trend, financial_health,
+                                                user_data, history, self.advisor)
+        return {"credit_score": credit_score, "trend": trend, "ai_recommendation": ai_recommendation}
+
+    async def report(self, body):
+        from reports.pdf_generator import create_chart, render_pdf
+        from services.credit_score import get_ai_recommendation
+
+        user_data = _user_data(body)
+        credit_score, trend, financial_health, history = await self.blocking(
+            self._score, user_data, _history(body), body.get("user_id"))
+        ai_recommendation = body.get("ai_recommendation")
+        if not isinstance(ai_recommendation, str):
+            ai_recommendation = await self.blocking(get_ai_recommendation, credit_score, trend, financial_health,
+                                                    user_data, history, self.advisor)
+
+        chart_png = await self.blocking(create_chart, user_data, history) if history else None
+        report = dict(financial_health, trend=trend, ai_recommendation=ai_recommendation)
+        return await self.blocking(render_pdf, credit_score, report, chart_png)
+
+
+def _before_deadline(fn, *args, **kwargs):
+    check_deadline()  # Queued past the deadline: nobody is waiting for the result
+    return fn(*args, **kwargs)
+
+
+def _score_batch(profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Vectorized scoring and rules for a list of profiles, one result dict per profile"""
+    import numpy as np
+    from services.batch_scoring import SCORING_COLUMNS, calculate_financial_health_batch
+    from rules.engine import evaluate_credit_profiles
+
+    fields = set(SCORING_COLUMNS)
+    for profile in profiles:
+        fields.update(key for key, value in profile.items() if isinstance(value, (int, float, str)))
+    columns = {}
+    for field in fields:
+        default = SCORING_COLUMNS.get(field, 0)
+        values = [profile.get(field, default) for profile in profiles]
+        if field in NUMERIC_FIELDS or field in OPTIONAL_NUMERIC_FIELDS:
+            columns[field] = np.array(values, dtype=np.float64)  # Validated by _check_profile
+        else:
+            columns[field] = np.array(values, dtype=object if any(isinstance(v, str) or v is None for v in values)
+                                      else np.float64)
+
+    scored = calculate_financial_health_batch(columns)
+    rules = evaluate_credit_profiles(columns, scored["credit_score"])
+    return [{
+        "credit_score": int(scored["credit_score"][i]),
+        "health_score": int(scored["health_score"][i]),
+        "debt_to_income": float(scored["debt_to_income"][i]),
+        "risk_profile": str(scored["risk_profile"][i]),
+        "risk_factors": {name: bool(values[i]) for name, values in scored["risk_factors"].items()},
+        "rules": {name: bool(hits[i]) for name, hits in rules.items()},
+    } for i in range(len(profiles))]
+
+
+ROUTES = {
+    ("POST", "/v1/score"): "score",
+    ("POST", "/v1/score/batch"): "score_batch",
+    ("POST", "/v1/recommendation"): "recommendation",
+    ("POST", "/v1/report"): "report",
+}
+
+
+# ---------------- HTTP ----------------
+
+class HttpServer:
+    """Minimal HTTP/1.1 server (keep-alive, Content-Length bodies) over asyncio streams"""
+
+    def __init__(self, api: CreditApi, max_in_flight: int = API_MAX_IN_FLIGHT):
+        self.api = api
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0  # Requests being handled, plus timed-out ones whose blocking work still runs
+        self._releases = set()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, content_type, payload, extra = await self._dispatch(method, path, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, content_type, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ApiError as e:
+            # Unreadable request: answer once and drop the connection
+            self._write_response(writer, e.status, "application/json",
+                                 json.dumps({"error": str(e)}).encode("utf-8"), {}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            raise ApiError(431, "Request line too long")
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ApiError(400, "Malformed request line")
+
+        headers = {}
+        header_bytes = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise ApiError(431, "Header line too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header_bytes += len(line)
+            if len(headers) >= API_MAX_HEADERS or header_bytes > API_MAX_HEADER_BYTES:
+                raise ApiError(431, "Too many or too large headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise ApiError(411, "Send a Content-Length body")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise ApiError(400, "Invalid Content-Length")
+        if length > API_MAX_BODY_BYTES:
+            raise ApiError(413, f"Body larger than {API_MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        if method == "GET" and path == "/health":
+            return 200, "application/json", b'{"status": "ok"}', {}
+        if method == "GET" and path == "/metrics":
+            return 200, "text/plain; version=0.0.4; charset=utf-8", render_metrics().encode("utf-8"), {}
+
+        handler = ROUTES.get((method, path))
+        if handler is None:
+            status = 405 if any(route_path == path for _, route_path in ROUTES) else 404
+            return status, "application/json", json.dumps({"error": HTTPStatus(status).phrase}).encode("utf-8"), {}
+
+        # Backpressure: shed load immediately rather than letting latency grow without bound
+        if self.in_flight >= self.max_in_flight:
+            return 503, "application/json", b'{"error": "Server busy"}', {"Retry-After": "1"}
+
+        self.in_flight += 1
+        work = []
+        token = _request_work.set(work)
+        try:
+            with trace(headers.get("x-request-id")), span("api_request", route=path) as current:
+                status, content_type, payload, extra = await self._call(handler, headers, body)
+                current.outcome = str(status)
+                return status, content_type, payload, extra
+        finally:
+            _request_work.reset(token)
+            self._release(work)
+
+    def _release(self, work):
+        """Free the request's slot once none of its blocking work is still running.
+
+        A request past its deadline stops waiting, but a call already running on the
+        pool cannot be interrupted; it keeps the slot until it ends, so max_in_flight
+        bounds the work actually in progress, not just the requests being awaited.
+        """
+        running = [future for future in work if not future.done()]
+        if not running:
+            self.in_flight -= 1
+            return
+        task = asyncio.ensure_future(asyncio.wait([asyncio.wrap_future(future) for future in running]))
+        self._releases.add(task)
+
+        def released(_):
+            self._releases.discard(task)
+            self.in_flight -= 1
+
+        task.add_done_callback(released)
+
+    async def _call(self, handler: str, headers: Dict[str, str], body: bytes):
+        try:
+            timeout = min(float(headers.get("x-request-timeout", API_REQUEST_TIMEOUT_SECONDS)),
+                          API_REQUEST_TIMEOUT_SECONDS)
+        except ValueError:
+            timeout = API_REQUEST_TIMEOUT_SECONDS
+        if not math.isfinite(timeout) or timeout <= 0:
+            timeout = API_REQUEST_TIMEOUT_SECONDS
+        try:
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                raise ApiError(400, "Body is not valid JSON")
+            if not isinstance(request, dict):
+                raise ApiError(400, "Body must be a JSON object")
+            with deadline(timeout):
+                result = await asyncio.wait_for(getattr(self.api, handler)(request), timeout=timeout)
+        except ApiError as e:
+            return e.status, "application/json", json.dumps({"error": str(e)}).encode("utf-8"), e.headers
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            return 504, "application/json", b'{"error": "Deadline exceeded"}', {}
+        except Exception:
+            logger.exception("Unhandled error in %s", handler)
+            return 500, "application/json", b'{"error": "Internal server error"}', {}
+
+        if isinstance(result, bytes):
+            return 200, "application/pdf", result, {}
+        return 200, "application/json", json.dumps(result, default=str).encode("utf-8"), {}
+
+    @staticmethod
+    def _write_response(writer, status: int, content_type: str, payload: bytes, extra: Dict[str, str],
+                        keep_alive: bool):
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(payload)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+
+
+# ---------------- Workers ----------------
+
+async def serve(host: str = API_HOST, port: int = API_PORT, reuse_port: bool = False):
+    """Serve until cancelled, in the current process"""
+    from db import init_db
+    init_db()  # Migrate the schema before accepting requests
+    server = HttpServer(CreditApi())
+    listener = await asyncio.start_server(server.handle_connection, host, port, reuse_port=reuse_port,
+                                          backlog=1024)
+    async with listener:
+        await listener.serve_forever()
+
+
+def _run_worker(host: str, port: int, reuse_port: bool):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl+C and stops the workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # Not the parent's handler, inherited through fork
+    try:
+        asyncio.run(serve(host, port, reuse_port))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the credit scoring JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Worker processes sharing the port")
+    args = parser.parse_args()
+
+    workers = max(args.workers, 1)
+    if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        print("SO_REUSEPORT is not available on this platform; running a single worker")
+        workers = 1
+
+    if workers == 1:
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # Stop the workers on shutdown too
+    processes = [multiprocessing.Process(target=_run_worker, args=(args.host, args.port, True), daemon=True)
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"Serving on {args.host}:{args.port} with {workers} workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# batch_reports.py
+"""Offline re-scoring and PDF report generation for every user in credit_data.db.
+
+Run from the app directory:
+
+    python batch_reports.py --db credit_data.db --out reports --workers 8
+
+Users are streamed in chunks of their latest snapshot, scored and rendered across a
+process pool, and written back to the report_results table one chunk per transaction.
+A user whose latest snapshot already has a result is skipped, so an interrupted run
+picks up where it stopped (use --force to redo everyone).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import CHART_HISTORY_LIMIT
+from db import get_connection, get_user_history, HISTORY_COLUMNS, COHORT_COLUMNS
+from rules.engine import evaluate_credit_profile
+from services.batch_scoring import SCORING_COLUMNS
+from services.credit_score import calculate_financial_health
+from reports.pdf_generator import create_pdf, create_chart
+
+SNAPSHOT_FIELDS = ["income", "expenses", "loan_amount", "credit_util", "missed_payments"]
+HISTORY_FIELDS = HISTORY_COLUMNS + COHORT_COLUMNS
+
+
+def init_results_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS report_results (
+            user_id TEXT PRIMARY KEY,
+            snapshot_id INTEGER,
+            credit_score INTEGER,
+            health_score INTEGER,
+            debt_to_income FLOAT,
+            risk_profile TEXT,
+            trend TEXT,
+            rules TEXT,
+            pdf_path TEXT,
+            generated_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def iter_user_chunks(db_path: str, chunk_size: int, force: bool, history_limit: int = CHART_HISTORY_LIMIT):
+    """Yield lists of (user_id, history) whose latest snapshot has no report yet.
+
+    Users are paged by user_id (keyset pagination) and each history is capped at the
+    newest ``history_limit`` snapshots, so memory is bounded by one chunk no matter how
+    large the table or any one user's history is. History rows are newest first, as
+    returned by get_user_history.
+    """
+    conn = get_connection(db_path)
+    last_user_id = ""
+    while True:
+        user_ids = [row[0] for row in conn.execute(
+            "SELECT DISTINCT user_id FROM user_data WHERE user_id > ? ORDER BY user_id LIMIT ?",
+            (last_user_id, chunk_size))]
+        if not user_ids:
+            return
+        last_user_id = user_ids[-1]
+
+        placeholders = ",".join("?" * len(user_ids))
+        # dicts pickle to the workers
+        histories: Dict[str, List[Dict]] = {
+            user_id: [dict(row) for row in get_user_history(user_id, limit=history_limit, columns=HISTORY_FIELDS,
+                                                            db_path=db_path)]
+            for user_id in user_ids}
+
+        if not force:
+            done = dict(conn.execute(
+                f"SELECT user_id, snapshot_id FROM report_results WHERE user_id IN ({placeholders})", user_ids))
+            histories = {user_id: history for user_id, history in histories.items()
+                         if done.get(user_id) != history[0]["id"]}
+
+        yield list(histories.items()), len(user_ids)
+
+
+def _report_filename(user_id: str) -> str:
+    """Filesystem-safe, collision-free name for a user's report"""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", user_id)[:40]
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}_{digest}"
+
+
+def process_user_safely(job: Tuple[str, List[Dict], str]) -> Tuple[Optional[Tuple], Optional[str]]:
+    """process_user's result and None, or None and the error, so one bad user cannot stop the run"""
+    try:
+        return process_user(job), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def snapshot_profile(snapshot: Dict) -> Dict:
+    """user_data for a stored snapshot, with the NULL defaults peer_rank.rebuild_peer_scores applies"""
+    user_data = {field: snapshot[field] or 0 for field in SNAPSHOT_FIELDS}
+    user_data["age"] = SCORING_COLUMNS["age"] if snapshot["age"] is None else snapshot["age"]
+    user_data["job_stability"] = snapshot["job_stability"]
+    user_data["primary_bank"] = snapshot["primary_bank"]
+    return user_data
+
+
+def process_user(job: Tuple[str, List[Dict], str]) -> Tuple:
+    """Score one user's latest snapshot and render their chart and PDF (runs in a worker)"""
+    user_id, history, out_dir = job
+    latest = history[0]
+    user_data = snapshot_profile(latest)
+
+    credit_score, trend, financial_health = calculate_financial_health(user_data, history)
+    rules_output = evaluate_credit_profile(user_data, credit_score)
+
+    name = _report_filename(user_id)
+    chart_path = create_chart(user_data, history, os.path.join(out_dir, f"{name}.png"))
+    financial_health["trend"] = trend
+    pdf_path = create_pdf(credit_score, financial_health, chart_path, filename=f"{name}.pdf", output_dir=out_dir)
+
+    return (user_id, latest["id"], credit_score, financial_health["health_score"],
+            financial_health["debt_to_income"], financial_health["risk_profile"], trend,
+            json.dumps(rules_output), pdf_path, datetime.now().isoformat())
+
+
+def run(db_path: str, out_dir: str, workers: int, chunk_size: int, force: bool = False) -> int:
+    """Generate the pending reports and return how many were written.
+
+    A user whose report fails is reported on stderr and left without a result, so the
+    next run retries them; every other report in the chunk is still saved.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    conn = get_connection(db_path)
+    init_results_table(conn)
+    total_users = conn.execute("SELECT COUNT(DISTINCT user_id) FROM user_data").fetchone()[0]
+
+    seen = generated = failed = 0
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for pending, chunk_users in iter_user_chunks(db_path, chunk_size, force):
+            jobs = [(user_id, history, out_dir) for user_id, history in pending]
+            results = []
+            outcomes = executor.map(process_user_safely, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+            for (user_id, _, _), (result, error) in zip(jobs, outcomes):
+                if error is None:
+                    results.append(result)
+                else:
+                    failed += 1
+                    print(f"Report for {user_id!r} failed: {error}", file=sys.stderr)
+
+            conn.executemany("""
+                INSERT OR REPLACE INTO report_results
+                    (user_id, snapshot_id, credit_score, health_score, debt_to_income,
+                     risk_profile, trend, rules, pdf_path, generated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, results)
+            conn.commit()  # Each finished chunk survives an interruption
+
+            seen += chunk_users
+            generated += len(results)
+            elapsed = time.monotonic() - start
+            rate = generated / elapsed if elapsed else 0.0
+            print(f"[{seen}/{total_users} users] {generated} reports generated, {failed} failed, "
+                  f"{rate:,.1f} reports/s", file=sys.stderr)
+
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score every user and regenerate their PDF reports")
+    parser.add_argument("--db", default="credit_data.db", help="SQLite database with the user_data table")
+    parser.add_argument("--out", default="reports_out", help="Directory for generated charts and PDFs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users loaded and written per batch")
+    parser.add_argument("--force", action="store_true", help="Regenerate reports that are already up to date")
+    args = parser.parse_args()
+
+    generated = run(args.db, args.out, args.workers, args.chunk_size, args.force)
+    print(f"Done: {generated} reports generated", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
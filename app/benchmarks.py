@@ -0,0 +1,358 @@
+# benchmarks.py
+"""Microbenchmarks for every stage of the analysis pipeline.
+
+Run from the app directory:
+
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --compare baseline.json --threshold 0.25
+    python benchmarks.py --stages database --rows 1k,100k,10m
+
+Each stage is timed over ``--repeat`` rounds and the median seconds per call is
+reported. ``--compare`` exits non-zero if any stage in the baseline got slower by
+more than ``--threshold`` (0.25 = 25%), so it can gate a deploy. AI stages run
+against a local stub inference server, and database stages use throwaway SQLite
+files of the requested sizes, so nothing touches the real services or data.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+from config.settings import DB_BULK_CHUNK_SIZE
+
+STAGES = ("scoring", "rules", "advisor", "database", "chart", "pdf")
+DEFAULT_ROWS = "1k,100k"  # Add 10m explicitly; populating it takes minutes
+HISTORY_ROWS = 100  # Snapshots the benchmarked user has in each database
+STUB_RESPONSE = " ".join(["Build an emergency fund, clear high-interest debt first, then invest monthly."] * 3)
+
+SAMPLE_PROFILE = {
+    "income": 85000,
+    "expenses": 52000,
+    "loan_amount": 240000,
+    "credit_util": 45,
+    "missed_payments": 1,
+    "age": 32,
+    "dependents": 1,
+    "job_stability": "stable",
+    "risk_appetite": "moderate",
+    "financial_goals": ["emergency_fund", "debt_free"],
+    "current_investments": ["fd"],
+    "preferred_investment_duration": "3-5 years",
+    "primary_bank": "HDFC",
+    "existing_credit_cards": 2,
+    "last_credit_check": "3-6 months ago",
+    "loan_types": ["credit_card", "personal_loan"],
+    "financial_concerns": "",
+}
+
+
+# ---------------- Stub inference server ----------------
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers like the HuggingFace inference API, after the server's latency and with its status"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.status == 200:
+            out = json.dumps([{"generated_text": body["inputs"] + " " + STUB_RESPONSE}]).encode("utf-8")
+        else:
+            out = json.dumps({"error": "Simulated failure"}).encode("utf-8")
+        self.send_response(stub.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+class StubInferenceServer:
+    """Local stand-in for the remote models: ``with StubInferenceServer() as url: ...``
+
+    ``latency`` and ``status`` may be changed while it runs, e.g. to simulate an
+    endpoint failing and recovering; ``requests`` counts the requests received.
+    """
+
+    def __init__(self, latency: float = 0.0, status: int = 200):
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/models/stub"
+
+    def __enter__(self) -> str:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---------------- Timing ----------------
+
+def measure(fn: Callable[[int], Any], repeat: int, number: int) -> Dict[str, float]:
+    """Median and best seconds per call of ``fn(i)``; ``i`` is unique per call so caches can be bypassed"""
+    fn(-1)  # Warm-up: lazy imports, connections and pools are not part of the measurement
+    per_call = []
+    i = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(i)
+            i += 1
+        per_call.append((time.perf_counter() - start) / number)
+    return {"median_seconds": statistics.median(per_call), "min_seconds": min(per_call), "calls": repeat * number}
+
+
+def _history(points: int = 12) -> List[Dict[str, Any]]:
+    start = datetime(2025, 1, 1)
+    return [{"timestamp": (start + timedelta(days=30 * i)).isoformat(), "loan_amount": 300000 - 5000 * i}
+            for i in reversed(range(points))]
+
+
+# ---------------- Stages ----------------
+
+def bench_scoring(args) -> Dict[str, Dict[str, float]]:
+    from services.credit_score import calculate_financial_health
+
+    history = _history()
+    return {"calculate_financial_health": measure(
+        lambda i: calculate_financial_health(SAMPLE_PROFILE, history), args.repeat, 2000)}
+
+
+def bench_rules(args) -> Dict[str, Dict[str, float]]:
+    from rules.engine import evaluate_credit_profile
+
+    return {"evaluate_credit_profile": measure(
+        lambda i: evaluate_credit_profile(SAMPLE_PROFILE, 720), args.repeat, 2000)}
+
+
+def bench_advisor(args) -> Dict[str, Dict[str, float]]:
+    from ai.backends import RemoteInferenceBackend
+    from services.ai_cache import PromptCache
+    from services.credit_score import AIFinancialAdvisor, calculate_financial_health, get_ai_recommendation
+
+    history = _history()
+    credit_score, trend, financial_health = calculate_financial_health(SAMPLE_PROFILE, history)
+    cache_dir = tempfile.mkdtemp(prefix="credai-bench-")
+    results = {}
+    try:
+        with StubInferenceServer(latency=args.stub_latency) as url:
+            advisor = AIFinancialAdvisor(backend=RemoteInferenceBackend([url]),
+                                         cache=PromptCache(path=os.path.join(cache_dir, "cache.db")))
+            results["analyze_user_profile"] = measure(
+                lambda i: advisor.analyze_user_profile(SAMPLE_PROFILE), args.repeat, 2000)
+
+            # Cached: the same prompts every call, as on reruns and repeat visitors
+            results["get_ai_recommendation_cached"] = measure(
+                lambda i: get_ai_recommendation(credit_score, trend, financial_health, SAMPLE_PROFILE, history,
+                                                advisor), args.repeat, 20)
+
+            # Uncached: every prompt goes to the stub server
+            uncached = AIFinancialAdvisor(backend=advisor.backend, cache=advisor.cache)
+            uncached.cache = None  # Passing cache=None would fall back to the shared on-disk cache
+            results["get_ai_recommendation"] = measure(
+                lambda i: get_ai_recommendation(credit_score, trend, financial_health, SAMPLE_PROFILE, history,
+                                                uncached), args.repeat, 5)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def parse_rows(text: str) -> List[int]:
+    """'1k,100k,10m' -> [1000, 100000, 10000000]"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        if part[-1:] in multipliers:
+            sizes.append(int(float(part[:-1]) * multipliers[part[-1]]))
+        else:
+            sizes.append(int(part))
+    return sizes
+
+
+def _label(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}m"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+
+def _populate(db_path: str, rows: int, user_id: str):
+    """``rows`` snapshots: HISTORY_ROWS for ``user_id`` and the rest spread over other users"""
+    from db import insert_snapshots, refresh_user_summaries
+
+    others = max((rows - HISTORY_ROWS) // HISTORY_ROWS, 1)
+    start = datetime(2024, 1, 1)
+
+    def snapshot(i):
+        owner = user_id if i < HISTORY_ROWS else f"user{i % others}"
+        timestamp = (start + timedelta(minutes=i)).isoformat()
+        return (owner, 60000 + i % 40000, 35000, 200000 - i % 150000, 30 + i % 60, i % 4, timestamp)
+
+    for offset in range(0, rows, DB_BULK_CHUNK_SIZE):
+        insert_snapshots((snapshot(i) for i in range(offset, min(offset + DB_BULK_CHUNK_SIZE, rows))), db_path)
+    refresh_user_summaries(db_path=db_path)
+
+
+def bench_database(args) -> Dict[str, Dict[str, float]]:
+    from db import save_user_data, get_user_history, close_connection
+
+    results = {}
+    for rows in parse_rows(args.rows):
+        db_dir = tempfile.mkdtemp(prefix="credai-bench-")
+        db_path = os.path.join(db_dir, "bench.db")
+        try:
+            _populate(db_path, rows, "bench_user")
+            label = _label(rows)
+            # Reads first, and writes to another existing user, so every read sees exactly
+            # the HISTORY_ROWS snapshots _populate gave bench_user
+            results[f"get_user_history[{label}]"] = measure(
+                lambda i: get_user_history("bench_user", columns=("timestamp", "loan_amount"), db_path=db_path),
+                args.repeat, 500)
+            results[f"save_user_data[{label}]"] = measure(
+                lambda i: save_user_data("user0", SAMPLE_PROFILE, db_path), args.repeat, 200)
+        finally:
+            close_connection(db_path)
+            shutil.rmtree(db_dir, ignore_errors=True)
+    return results
+
+
+def bench_chart(args) -> Dict[str, Dict[str, float]]:
+    from reports.pdf_generator import create_chart
+
+    history = _history(50)
+
+    def render(i):
+        # A different series per call, so the chart cache never answers
+        return create_chart(SAMPLE_PROFILE, [{"timestamp": h["timestamp"], "loan_amount": h["loan_amount"] + i}
+                                             for h in history])
+
+    return {"create_chart": measure(render, args.repeat, 5)}
+
+
+def bench_pdf(args) -> Dict[str, Dict[str, float]]:
+    from reports.pdf_generator import create_chart, create_pdf
+    from services.credit_score import calculate_financial_health
+
+    history = _history()
+    credit_score, trend, financial_health = calculate_financial_health(SAMPLE_PROFILE, history)
+    chart_png = create_chart(SAMPLE_PROFILE, history)
+    out_dir = tempfile.mkdtemp(prefix="credai-bench-")
+
+    def render(i):
+        # A different recommendation per call, so the PDF cache never answers
+        report = dict(financial_health, trend=trend, ai_recommendation=f"{STUB_RESPONSE} ({i})")
+        return create_pdf(credit_score, report, chart_png, output_dir=out_dir)
+
+    try:
+        return {"create_pdf": measure(render, args.repeat, 10)}
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "scoring": bench_scoring,
+    "rules": bench_rules,
+    "advisor": bench_advisor,
+    "database": bench_database,
+    "chart": bench_chart,
+    "pdf": bench_pdf,
+}
+
+
+# ---------------- Baselines ----------------
+
+def run(args) -> Dict[str, Any]:
+    results = {}
+    for stage in args.stages.split(","):
+        results.update(BENCHMARKS[stage.strip()](args))
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a comparison table and return the stages slower than baseline by more than ``threshold``"""
+    regressions = []
+    width = max(len(name) for name in current["results"])
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<{width}}  {result['median_seconds'] * 1000:10.3f} ms  (no baseline)")
+            continue
+        change = result["median_seconds"] / before["median_seconds"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:<{width}}  {result['median_seconds'] * 1000:10.3f} ms  "
+              f"{before['median_seconds'] * 1000:10.3f} ms  {change:+8.1%}  {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the credit analysis pipeline stages")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="Database sizes to benchmark, e.g. 1k,100k,10m")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per stage (the median is reported)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds the stub model waits per request")
+    parser.add_argument("--save", help="Write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown before a stage counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    unknown = set(stage.strip() for stage in args.stages.split(",")) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    current = run(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        width = max(len(name) for name in current["results"])
+        for name, result in current["results"].items():
+            print(f"{name:<{width}}  {result['median_seconds'] * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,87 @@
+import os
+
 APP_NAME = "AI Credit Planner"
+
+# Database
+DB_PATH = os.environ.get("CREDAI_DB_PATH", "credit_data.db")
+DB_CACHE_SIZE_KB = 16 * 1024  # Page cache per connection
+DB_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+DB_BULK_CHUNK_SIZE = 50000  # Rows per transaction for bulk ingestion
+
+# AI inference
+AI_BACKEND = os.environ.get("CREDAI_AI_BACKEND", "remote")  # "remote" (HuggingFace API) or "local"
+AI_REQUEST_TIMEOUT_SECONDS = 20
+AI_CONCURRENT_MODE = True  # Run advisor prompts in parallel and hedge model endpoints
+AI_HEDGE_DELAY_SECONDS = 2.0  # Wait this long for a model before also trying the next one
+
+# AI response cache
+AI_CACHE_ENABLED = True
+AI_CACHE_PATH = "ai_cache.db"
+AI_CACHE_MAX_ENTRIES = 5000
+AI_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# AI endpoint pooling and health
+AI_HTTP_POOL_SIZE = 10
+AI_HEALTH_WINDOW = 20  # Recent attempts used for rolling latency and error rate
+AI_BREAKER_FAILURE_THRESHOLD = 3  # Consecutive failures that open an endpoint's circuit
+AI_BREAKER_ERROR_RATE = 0.5  # Rolling error rate that opens the circuit once the window is full
+AI_BREAKER_COOLDOWN_SECONDS = 30.0  # Time before a half-open probe is let through
+
+# Local in-process inference (AI_BACKEND = "local")
+AI_LOCAL_MODEL_PATH = os.environ.get("CREDAI_LOCAL_MODEL_PATH", "models/local-llm")
+AI_LOCAL_MAX_NEW_TOKENS = 128  # Upper bound on generated tokens, whatever the caller asks for
+AI_LOCAL_MAX_INPUT_TOKENS = 512
+AI_LOCAL_BATCHING = True  # Batch concurrent local generations through one scheduler
+AI_BATCH_MAX_SIZE = 8
+AI_BATCH_MAX_WAIT_SECONDS = 0.05  # How long the first prompt waits for others to join its batch
+
+# Reports
+CHART_MAX_POINTS = 200  # Longer loan histories are downsampled (LTTB) before plotting
+CHART_HISTORY_LIMIT = 1000  # Newest snapshots read for a trend chart; older ones are not plotted
+CHART_CACHE_SIZE = 256  # Rendered charts kept in memory, keyed by the plotted series
+PDF_CACHE_SIZE = 128  # Rendered reports kept in memory, keyed by their content hash
+
+# Market data
+MARKET_DATA_PATH = os.environ.get("CREDAI_MARKET_DATA_PATH",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_data.json"))
+MARKET_DATA_RELOAD_SECONDS = 5.0  # How often the file's mtime is checked for hot reload
+
+# Rules
+RULES_PATH = os.environ.get("CREDAI_RULES_PATH",
+                            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         "rules", "rules.json"))
+
+# Background jobs
+JOB_WORKERS = 4
+JOB_MAX_PER_USER = 2  # Queued or running jobs a single user may have at once
+JOB_RETENTION_SECONDS = 60 * 60  # Finished jobs stay retrievable this long
+JOB_POLL_SECONDS = 1.0
+
+# Startup
+WARMUP_ENABLED = os.environ.get("CREDAI_WARMUP", "1") != "0"  # Pre-load heavy modules after the first page
+
+# Telemetry
+TELEMETRY_ENABLED = os.environ.get("CREDAI_TELEMETRY", "1") != "0"
+TELEMETRY_JSON_LOGS = os.environ.get("CREDAI_TRACE_LOGS", "0") == "1"  # One JSON line per finished span
+METRICS_PORT = int(os.environ.get("CREDAI_METRICS_PORT", "0"))  # Serve /metrics on this port; 0 disables
+METRICS_HOST = os.environ.get("CREDAI_METRICS_HOST", "127.0.0.1")  # Set to 0.0.0.0 to let other hosts scrape
+LATENCY_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+# JSON API (api_server.py)
+API_HOST = os.environ.get("CREDAI_API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("CREDAI_API_PORT", "8080"))
+API_WORKERS = int(os.environ.get("CREDAI_API_WORKERS", str(os.cpu_count() or 1)))
+API_MAX_IN_FLIGHT = 256  # Requests a worker accepts at once before answering 503
+API_BLOCKING_THREADS = 32  # Per-worker threads for inference, database and PDF calls
+API_REQUEST_TIMEOUT_SECONDS = 30.0  # Default deadline; clients may ask for less with X-Request-Timeout
+API_MAX_BODY_BYTES = 1024 * 1024
+API_MAX_HEADERS = 100  # Requests with more header lines or header bytes than these get 431
+API_MAX_HEADER_BYTES = 64 * 1024
+API_MAX_BATCH_SIZE = 10000
+
+# Analytics archive (services/archive.py)
+ARCHIVE_PATH = os.environ.get("CREDAI_ARCHIVE_PATH", "snapshot_archive")
+
+# Trend analytics (services/trends.py)
+TREND_EMA_ALPHA = 0.3  # Weight of the newest snapshot in the moving averages
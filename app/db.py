@@ -1,10 +1,69 @@
 import sqlite3
+import threading
 from datetime import datetime
+from config.settings import DB_PATH, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_BYTES, DB_BUSY_TIMEOUT_MS, DB_BULK_CHUNK_SIZE
+from services.trends import TREND_FIELDS, update_trend, describe_trend, normalize_timestamp
+from services.peer_rank import record_scores, rebuild_peer_scores
 
-def init_db():
-    conn = sqlite3.connect("credit_data.db")
-    cursor = conn.cursor()
-    cursor.execute("""
+# Rebuilds user_summary rows from user_data; {where} optionally restricts the users
+SUMMARY_ROLLUP_SQL = """
+    SELECT user_id,
+           COUNT(*),
+           MAX(CASE WHEN rn = 1 THEN id END),
+           MAX(CASE WHEN rn = 1 THEN timestamp END),
+           MAX(CASE WHEN rn = 1 THEN income END),
+           MAX(CASE WHEN rn = 1 THEN expenses END),
+           MAX(CASE WHEN rn = 1 THEN loan_amount END),
+           MAX(CASE WHEN rn = 1 THEN credit_util END),
+           MAX(CASE WHEN rn = 1 THEN missed_payments END),
+           MAX(CASE WHEN rn = 2 THEN loan_amount END),
+           MIN(loan_amount),
+           MAX(loan_amount),
+           SUM(loan_amount)
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS rn
+        FROM user_data {where}
+    )
+    GROUP BY user_id
+"""
+
+UPSERT_TREND_SQL = f"""
+    INSERT OR REPLACE INTO user_trends (user_id, {', '.join(TREND_FIELDS)})
+    VALUES ({', '.join('?' * (len(TREND_FIELDS) + 1))})
+"""
+
+
+def _rebuild_trends(conn, where="", parameters=()):
+    """Recompute user_trends by replaying history oldest first; {where} optionally restricts the users"""
+    cursor = conn.execute(f"""
+        SELECT user_id, loan_amount, credit_util, missed_payments, timestamp FROM user_data {where}
+        ORDER BY user_id, timestamp, id
+    """, parameters)
+    pending = []
+    user_id, state = None, None
+    for row in cursor:
+        if row[0] != user_id:
+            if state is not None:
+                pending.append(_trend_row(user_id, state))
+            user_id, state = row[0], None
+        state = update_trend(state, *row[1:])
+        if len(pending) >= DB_BULK_CHUNK_SIZE:
+            conn.executemany(UPSERT_TREND_SQL, pending)
+            pending = []
+    if state is not None:
+        pending.append(_trend_row(user_id, state))
+    conn.executemany(UPSERT_TREND_SQL, pending)
+
+
+def _trend_row(user_id, state):
+    return (user_id, *(state[field] for field in TREND_FIELDS))
+
+
+# Schema changes, applied in order; PRAGMA user_version records how many have run.
+# A step is a SQL statement, or a callable taking the connection for work SQL cannot do.
+MIGRATIONS = [
+    [
+        """
         CREATE TABLE IF NOT EXISTS user_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id TEXT,
@@ -15,24 +74,383 @@ def init_db():
             missed_payments INTEGER,
             timestamp TEXT
         )
-    """)
-    conn.commit()
-    conn.close()
-
-def save_user_data(user_id, data):
-    conn = sqlite3.connect("credit_data.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO user_data (user_id, income, expenses, loan_amount, credit_util, missed_payments, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, data["income"], data["expenses"], data["loan_amount"], data["credit_util"], data["missed_payments"], datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
-
-def get_user_history(user_id):
-    conn = sqlite3.connect("credit_data.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM user_data WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
-    history = cursor.fetchall()
-    conn.close()
-    return history
\ No newline at end of file
+        """,
+    ],
+    [
+        # Serves "WHERE user_id = ? ORDER BY timestamp" without a scan or sort
+        "CREATE INDEX IF NOT EXISTS idx_user_data_user_timestamp ON user_data (user_id, timestamp)",
+    ],
+    [
+        # Per-user rollup kept current by save_user_data, so trends need no history scan
+        """
+        CREATE TABLE IF NOT EXISTS user_summary (
+            user_id TEXT PRIMARY KEY,
+            snapshot_count INTEGER,
+            latest_id INTEGER,
+            latest_timestamp TEXT,
+            income FLOAT,
+            expenses FLOAT,
+            loan_amount FLOAT,
+            credit_util FLOAT,
+            missed_payments INTEGER,
+            prev_loan_amount FLOAT,
+            min_loan_amount FLOAT,
+            max_loan_amount FLOAT,
+            sum_loan_amount FLOAT
+        )
+        """,
+        # Backfill from any existing history
+        "INSERT OR REPLACE INTO user_summary " + SUMMARY_ROLLUP_SQL.format(where=""),
+    ],
+    [
+        # Rolling trend statistics (services/trends.py), updated by save_user_data in O(1)
+        """
+        CREATE TABLE IF NOT EXISTS user_trends (
+            user_id TEXT PRIMARY KEY,
+            snapshot_count INTEGER,
+            last_timestamp TEXT,
+            last_loan_amount FLOAT,
+            last_credit_util FLOAT,
+            debt_ema FLOAT,
+            velocity_ema FLOAT,
+            util_slope_ema FLOAT,
+            missed_ema FLOAT,
+            change_mean FLOAT,
+            change_m2 FLOAT
+        )
+        """,
+        # Backfill from any existing history
+        _rebuild_trends,
+    ],
+    [
+        # Cohort fields for peer ranking (services/peer_rank.py); NULL for older rows
+        "ALTER TABLE user_data ADD COLUMN age INTEGER",
+        "ALTER TABLE user_data ADD COLUMN job_stability TEXT",
+        "ALTER TABLE user_data ADD COLUMN primary_bank TEXT",
+    ],
+    [
+        # Peer score distributions (services/peer_rank.py), updated by save_user_data in the same
+        # transaction so every process ranks against the same committed counts
+        """
+        CREATE TABLE IF NOT EXISTS peer_scores (
+            user_id TEXT PRIMARY KEY,
+            credit_score INTEGER,
+            health_score INTEGER,
+            age_band TEXT,
+            job_stability TEXT,
+            primary_bank TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS peer_counts (
+            metric TEXT,
+            field TEXT,
+            value TEXT,
+            score INTEGER,
+            count INTEGER,
+            PRIMARY KEY (metric, field, value, score)
+        ) WITHOUT ROWID
+        """,
+        # Backfill from every user's latest snapshot
+        rebuild_peer_scores,
+    ],
+]
+
+HISTORY_COLUMNS = ("id", "user_id", "income", "expenses", "loan_amount", "credit_util", "missed_payments", "timestamp")
+COHORT_COLUMNS = ("age", "job_stability", "primary_bank")  # Selectable by name, not in the default projection
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers no longer block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _migrate(conn):
+    # Each step reads the version under the write lock, so processes starting together
+    # (e.g. API workers) apply every migration exactly once between them
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.rollback()
+                return
+            for statement in MIGRATIONS[version]:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def init_db(db_path=DB_PATH):
+    """Create and migrate the schema; only does work the first time per process"""
+    if db_path in _initialized:
+        return
+    with _init_lock:
+        if db_path not in _initialized:
+            _migrate(get_connection(db_path, initialize=False))
+            _initialized.add(db_path)
+
+
+def get_connection(db_path=DB_PATH, initialize=True):
+    """This thread's pooled connection to the database, opened and tuned on first use"""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = _connect(db_path)
+    if initialize:
+        init_db(db_path)
+    return conn
+
+
+def close_connection(db_path=DB_PATH):
+    """Close this thread's connection, e.g. before a worker thread exits"""
+    connections = getattr(_local, "connections", {})
+    conn = connections.pop(db_path, None)
+    if conn is not None:
+        conn.close()
+
+
+def save_user_data(user_id, data, db_path=DB_PATH):
+    timestamp = datetime.now().isoformat()
+    conn = get_connection(db_path)
+    with conn:
+        cursor = conn.execute("""
+            INSERT INTO user_data (user_id, income, expenses, loan_amount, credit_util, missed_payments, timestamp,
+                                   age, job_stability, primary_bank)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, data["income"], data["expenses"], data["loan_amount"], data["credit_util"], data["missed_payments"], timestamp,
+              data.get("age"), data.get("job_stability"), data.get("primary_bank")))
+
+        # Roll the new snapshot into the summary in the same transaction (old values on the right-hand side)
+        conn.execute("""
+            INSERT INTO user_summary (user_id, snapshot_count, latest_id, latest_timestamp, income, expenses,
+                                      loan_amount, credit_util, missed_payments, prev_loan_amount,
+                                      min_loan_amount, max_loan_amount, sum_loan_amount)
+            VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                snapshot_count = snapshot_count + 1,
+                latest_id = excluded.latest_id,
+                latest_timestamp = excluded.latest_timestamp,
+                income = excluded.income,
+                expenses = excluded.expenses,
+                loan_amount = excluded.loan_amount,
+                credit_util = excluded.credit_util,
+                missed_payments = excluded.missed_payments,
+                prev_loan_amount = loan_amount,
+                min_loan_amount = MIN(min_loan_amount, excluded.loan_amount),
+                max_loan_amount = MAX(max_loan_amount, excluded.loan_amount),
+                sum_loan_amount = sum_loan_amount + excluded.loan_amount
+        """, (user_id, cursor.lastrowid, timestamp, data["income"], data["expenses"], data["loan_amount"],
+              data["credit_util"], data["missed_payments"], data["loan_amount"], data["loan_amount"],
+              data["loan_amount"]))
+
+        # Move the user in the peer score distributions
+        record_scores(conn, user_id, data)
+
+        # Fold the snapshot into the rolling trend statistics: one row read, one row written
+        cursor = conn.execute(f"SELECT {', '.join(TREND_FIELDS)} FROM user_trends WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        state = dict(zip(TREND_FIELDS, row)) if row else None
+        if state is not None and normalize_timestamp(state["last_timestamp"]) > timestamp:
+            # Older than a stored (e.g. ingested, future-dated) snapshot: replay to place it in order
+            _rebuild_trends(conn, "WHERE user_id = ?", (user_id,))
+            return
+        state = update_trend(state, data["loan_amount"], data["credit_util"], data["missed_payments"], timestamp)
+        conn.execute(UPSERT_TREND_SQL, _trend_row(user_id, state))
+
+
+def _projection(columns):
+    if columns is None:
+        return list(HISTORY_COLUMNS)
+    unknown = set(columns) - set(HISTORY_COLUMNS) - set(COHORT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown history columns: {sorted(unknown)}")
+    return list(columns)
+
+
+def get_user_history(user_id, limit=None, columns=None, before=None, db_path=DB_PATH):
+    """A user's snapshots, newest first.
+
+    Rows can be read by position or by column name. ``columns`` projects a subset of
+    HISTORY_COLUMNS (the default) and COHORT_COLUMNS, ``limit`` caps the row count and
+    ``before`` is a (timestamp, id) keyset cursor that returns only older rows. All of
+    these stay on the (user_id, timestamp) index.
+    """
+    sql = f"SELECT {', '.join(_projection(columns))} FROM user_data WHERE user_id = ?"
+    params = [user_id]
+    if before is not None:
+        sql += " AND (timestamp, id) < (?, ?)"
+        params.extend(before)
+    sql += " ORDER BY timestamp DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    cursor = get_connection(db_path).cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor.execute(sql, params).fetchall()
+
+
+def get_user_history_page(user_id, page_size, cursor=None, columns=None, db_path=DB_PATH):
+    """One page of history plus the cursor for the next page (None on the last page).
+
+    The timestamp and id columns are always included since the cursor is built from them.
+    """
+    projection = _projection(columns)
+    projection += [name for name in ("timestamp", "id") if name not in projection]
+    rows = get_user_history(user_id, limit=page_size, columns=projection, before=cursor, db_path=db_path)
+    next_cursor = (rows[-1]["timestamp"], rows[-1]["id"]) if len(rows) == page_size else None
+    return rows, next_cursor
+
+
+def get_user_summary(user_id, db_path=DB_PATH):
+    """Latest snapshot and loan rollup for a user, or None if they have no history"""
+    cursor = get_connection(db_path).cursor()
+    cursor.row_factory = sqlite3.Row
+    row = cursor.execute("SELECT * FROM user_summary WHERE user_id = ?", (user_id,)).fetchone()
+    if row is None:
+        return None
+    summary = dict(row)
+    summary["mean_loan_amount"] = summary["sum_loan_amount"] / summary["snapshot_count"]
+    return summary
+
+
+def get_user_trend(user_id, db_path=DB_PATH):
+    """Rolling trend analytics for a user (see services.trends), or None if they have no history"""
+    row = get_connection(db_path).execute(
+        f"SELECT {', '.join(TREND_FIELDS)} FROM user_trends WHERE user_id = ?", (user_id,)).fetchone()
+    return describe_trend(dict(zip(TREND_FIELDS, row))) if row else None
+
+
+def insert_snapshots(rows, db_path=DB_PATH):
+    """Insert already-validated (user_id, income, expenses, loan_amount, credit_util,
+    missed_payments, timestamp) tuples in a single transaction.
+
+    user_summary, user_trends and peer scores are not touched; call refresh_user_summaries once the load is
+    done, or use append_snapshots to keep them current as rows arrive.
+    """
+    conn = get_connection(db_path)
+    with conn:
+        conn.executemany("""
+            INSERT INTO user_data (user_id, income, expenses, loan_amount, credit_util, missed_payments, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+
+def _temp_users(conn, table, user_ids):
+    """Fill the temp table ``table`` with user ids, for "user_id IN (SELECT user_id FROM table)" filters"""
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} (user_id TEXT PRIMARY KEY)")
+    conn.execute(f"DELETE FROM {table}")
+    conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?)", ((user_id,) for user_id in user_ids))
+
+
+def _replay_users(conn, table):
+    """Rebuild user_summary and user_trends from full history for the users in temp table ``table``"""
+    where = f"WHERE user_id IN (SELECT user_id FROM {table})"
+    conn.execute("INSERT OR REPLACE INTO user_summary " + SUMMARY_ROLLUP_SQL.format(where=where))
+    _rebuild_trends(conn, where)
+
+
+def refresh_user_summaries(user_ids=None, db_path=DB_PATH):
+    """Recompute user_summary, user_trends and peer scores from history for the given users (or everyone)"""
+    conn = get_connection(db_path)
+    with conn:
+        if user_ids is None:
+            conn.execute("INSERT OR REPLACE INTO user_summary " + SUMMARY_ROLLUP_SQL.format(where=""))
+            _rebuild_trends(conn)
+            rebuild_peer_scores(conn)
+            return
+        _temp_users(conn, "refresh_users", user_ids)
+        _replay_users(conn, "refresh_users")
+        rebuild_peer_scores(conn, "user_id IN (SELECT user_id FROM refresh_users)")
+
+
+def append_snapshots(rows, db_path=DB_PATH):
+    """Insert validated snapshot tuples (as for insert_snapshots) and roll them into user_summary,
+    user_trends and peer scores, all in one transaction.
+
+    Each user's new rows are folded onto their stored summary and trend oldest first, O(1)
+    per row like save_user_data, so a chunk costs the same however much history is stored.
+    Only users with a new row older than their latest stored snapshot have their history
+    replayed, since the rolling state cannot place it.
+    """
+    conn = get_connection(db_path)
+    conn.execute("BEGIN IMMEDIATE")  # Holds the write lock, so every id above the current maximum is ours
+    try:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM user_data").fetchone()[0]
+        conn.executemany("""
+            INSERT INTO user_data (user_id, income, expenses, loan_amount, credit_util, missed_payments, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        snapshots = {}
+        for row in conn.execute("""
+            SELECT user_id, id, timestamp, income, expenses, loan_amount, credit_util, missed_payments
+            FROM user_data WHERE id > ? ORDER BY user_id, timestamp, id
+        """, (last_id,)):
+            snapshots.setdefault(row[0], []).append(row)
+
+        _temp_users(conn, "refresh_users", snapshots)
+        summaries = {row[0]: row[1:] for row in conn.execute("""
+            SELECT user_id, snapshot_count, latest_timestamp, loan_amount, min_loan_amount, max_loan_amount,
+                   sum_loan_amount
+            FROM user_summary WHERE user_id IN (SELECT user_id FROM refresh_users)
+        """)}
+        trends = {row[0]: dict(zip(TREND_FIELDS, row[1:])) for row in conn.execute(f"""
+            SELECT user_id, {', '.join(TREND_FIELDS)} FROM user_trends
+            WHERE user_id IN (SELECT user_id FROM refresh_users)
+        """)}
+
+        summary_rows, trend_rows, replays = [], [], []
+        for user_id, new in snapshots.items():
+            summary = summaries.get(user_id)
+            if summary is not None and normalize_timestamp(summary[1]) > new[0][2]:
+                replays.append(user_id)
+                continue
+            loans = [row[5] for row in new]
+            count, _, loan_amount, min_loan, max_loan, total = summary or (0, None, None, None, None, 0)
+            latest = new[-1]
+            summary_rows.append((
+                user_id, count + len(new), latest[1], latest[2], *latest[3:],
+                loans[-2] if len(new) > 1 else loan_amount,
+                min(loans) if min_loan is None else min(min_loan, *loans),
+                max(loans) if max_loan is None else max(max_loan, *loans),
+                total + sum(loans),
+            ))
+            state = trends.get(user_id)
+            for row in new:
+                state = update_trend(state, row[5], row[6], row[7], row[2])
+            trend_rows.append(_trend_row(user_id, state))
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO user_summary (user_id, snapshot_count, latest_id, latest_timestamp, income,
+                                                 expenses, loan_amount, credit_util, missed_payments,
+                                                 prev_loan_amount, min_loan_amount, max_loan_amount, sum_loan_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, summary_rows)
+        conn.executemany(UPSERT_TREND_SQL, trend_rows)
+        if replays:
+            _temp_users(conn, "replay_users", replays)
+            _replay_users(conn, "replay_users")
+        rebuild_peer_scores(conn, "user_id IN (SELECT user_id FROM refresh_users)")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
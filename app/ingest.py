@@ -0,0 +1,182 @@
+# ingest.py
+"""Bulk loading of user snapshots into user_data.
+
+Run from the app directory to stream a CSV or JSONL export into the database:
+
+    python ingest.py partner_export.csv --chunk-size 50000
+
+Each record needs user_id, income, expenses, loan_amount, credit_util and
+missed_payments, plus an optional ISO timestamp (defaults to now; offsets are converted
+to local time, the convention of every stored timestamp). Files are read
+row by row and written one chunk per transaction, so memory stays flat however
+large the input is. Invalid rows are reported with their row number and skipped.
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+from config.settings import DB_PATH, DB_BULK_CHUNK_SIZE
+from db import append_snapshots
+from services.trends import normalize_timestamp
+
+NUMERIC_FIELDS = ("income", "expenses", "loan_amount", "credit_util", "missed_payments")
+
+# A record from a reader, or the error raised while decoding it
+RawRecord = Union[Dict[str, Any], Exception]
+
+
+def _number_error(record: Dict[str, Any]) -> str:
+    """Describe the first unusable numeric field (the slow path, only taken for bad rows)"""
+    for field in NUMERIC_FIELDS:
+        raw = record.get(field)
+        if raw is None or raw == "":
+            return f"missing {field}"
+        try:
+            float(raw)
+        except (TypeError, ValueError):
+            return f"{field} is not a number: {raw!r}"
+    return "invalid number"
+
+
+def validate_record(record: Dict[str, Any], now: str) -> Tuple:
+    """Convert a raw record into an insertable row, raising ValueError if it is invalid"""
+    user_id = record.get("user_id")
+    if user_id is None or not str(user_id).strip():
+        raise ValueError("missing user_id")
+
+    try:
+        income, expenses, loan_amount, credit_util, missed_payments = (
+            float(record[field]) for field in NUMERIC_FIELDS)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(_number_error(record))
+
+    values = (income, expenses, loan_amount, credit_util, missed_payments)
+    if not all(math.isfinite(value) for value in values):
+        field = next(field for field, value in zip(NUMERIC_FIELDS, values) if not math.isfinite(value))
+        raise ValueError(f"{field} must be a finite number")
+    if min(values) < 0:
+        raise ValueError("numeric fields must not be negative")
+    if credit_util > 100:
+        raise ValueError("credit_util must be between 0 and 100")
+    if not missed_payments.is_integer():
+        raise ValueError("missed_payments must be a whole number")
+
+    timestamp = record.get("timestamp") or now
+    try:
+        timestamp = normalize_timestamp(timestamp)
+    except ValueError:
+        raise ValueError(f"timestamp is not ISO 8601: {timestamp!r}")
+
+    return (str(user_id).strip(), income, expenses, loan_amount, credit_util, int(missed_payments), timestamp)
+
+
+def ingest_records(records: Iterable[Tuple[int, RawRecord]], chunk_size: int = DB_BULK_CHUNK_SIZE,
+                   db_path: str = DB_PATH, max_errors: int = 1000) -> Dict[str, Any]:
+    """Validate and insert (row_number, record) pairs in chunked transactions.
+
+    Returns the inserted/rejected counts, the first ``max_errors`` (row_number, message)
+    errors and the elapsed time. Each chunk is folded into the summaries, trends and peer
+    scores of the users it touched as it is inserted, so neither memory nor the cost per
+    row grows with the history already stored.
+    """
+    now = datetime.now().isoformat()
+    inserted = rejected = 0
+    errors: List[Tuple[int, str]] = []
+    chunk = []
+    start = time.monotonic()
+
+    def flush():
+        nonlocal inserted
+        append_snapshots(chunk, db_path)
+        inserted += len(chunk)
+        chunk.clear()
+
+    for row_number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise ValueError(str(record))
+            row = validate_record(record, now)
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append((row_number, str(e)))
+            continue
+
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return {
+        "inserted": inserted,
+        "rejected": rejected,
+        "errors": errors,
+        "seconds": time.monotonic() - start,
+    }
+
+
+def save_user_data_bulk(records: Iterable[Dict[str, Any]], chunk_size: int = DB_BULK_CHUNK_SIZE,
+                        db_path: str = DB_PATH) -> Dict[str, Any]:
+    """Bulk counterpart of save_user_data for in-memory records (row numbers start at 1)"""
+    return ingest_records(enumerate(records, start=1), chunk_size, db_path)
+
+
+def iter_csv(path: str) -> Iterator[Tuple[int, RawRecord]]:
+    """Stream records from a CSV file with a header row; row numbers are file line numbers"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def iter_jsonl(path: str) -> Iterator[Tuple[int, RawRecord]]:
+    """Stream records from a JSON Lines file, one object per line"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                record = ValueError(f"invalid JSON: {e}")
+            yield line_number, record
+
+
+READERS = {"csv": iter_csv, "jsonl": iter_jsonl}
+
+
+def import_file(path: str, file_format: str = None, chunk_size: int = DB_BULK_CHUNK_SIZE,
+                db_path: str = DB_PATH, max_errors: int = 1000) -> Dict[str, Any]:
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    return ingest_records(READERS[file_format](path), chunk_size, db_path, max_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import user snapshots from CSV or JSONL")
+    parser.add_argument("path", help="Input file")
+    parser.add_argument("--format", choices=sorted(READERS), help="Input format (default: from extension)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database to load into")
+    parser.add_argument("--chunk-size", type=int, default=DB_BULK_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument("--max-errors", type=int, default=1000, help="Row errors to report in detail")
+    args = parser.parse_args()
+
+    report = import_file(args.path, args.format, args.chunk_size, args.db, args.max_errors)
+    for row_number, message in report["errors"]:
+        print(f"row {row_number}: {message}", file=sys.stderr)
+    rate = report["inserted"] / report["seconds"] if report["seconds"] else 0.0
+    print(f"Inserted {report['inserted']} rows, rejected {report['rejected']} "
+          f"in {report['seconds']:.2f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
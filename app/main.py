@@ -1,19 +1,187 @@
 import streamlit as st
 from ui.form import get_user_input_form
 from ui.layout import show_insights, show_dashboard
+from ui.cache import (get_database, get_advisor, get_market_data, get_job_manager, analysis_key,
+                      get_session_analysis, store_session_analysis)
+from services.jobs import DONE, FAILED, JobLimitError
+from services.telemetry import span, trace, start_metrics_server
+from config.settings import JOB_POLL_SECONDS, CHART_HISTORY_LIMIT
 from rules.engine import evaluate_credit_profile
-from services.credit_score import calculate_financial_health, get_ai_recommendation
-from db import init_db, save_user_data, get_user_history
-from reports.pdf_generator import create_pdf, create_chart
-import os
+from services.credit_score import calculate_financial_health, stream_ai_recommendation
+from services.peer_rank import peer_percentiles
+from db import save_user_data, get_user_history, get_user_summary, get_user_trend
+from reports.pdf_generator import render_pdf, create_chart
+from warmup import start_warmup
+
+def show_results(analysis):
+    user_data = analysis["user_data"]
+    credit_score = analysis["credit_score"]
+    financial_health = analysis["financial_health"]
+
+    # Show dashboard
+    show_dashboard(user_data, credit_score, analysis["rules_output"])
+
+    # Enhanced metrics
+    st.subheader("📊 Financial Health Summary")
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Credit Score", f"{credit_score}/900",
+                  delta="Excellent" if credit_score >= 750 else "Good" if credit_score >= 650 else "Needs Work")
+
+    with col2:
+        debt_ratio = user_data['loan_amount'] / max(user_data['income'], 1)
+        st.metric("Debt Ratio", f"{debt_ratio:.1%}",
+                  delta="✅ Healthy" if debt_ratio < 0.4 else "⚠️ High")
+
+    with col3:
+        # Use get() with fallback to avoid KeyError
+        risk_profile = financial_health.get('risk_profile', 'Moderate')
+        st.metric("Health Score", f"{financial_health['health_score']}/100",
+                  delta=risk_profile)
+
+    with col4:
+        surplus = user_data['income'] - user_data['expenses']
+        st.metric("Monthly Surplus", f"₹{surplus:,.0f}",
+                  delta="Good" if surplus > 5000 else "Tight" if surplus > 0 else "Deficit")
+
+    # Peer percentiles, overall and within the user's cohorts
+    peer_ranks = analysis.get("peer_ranks")
+    if peer_ranks and peer_ranks["overall"]["peers"] > 1:
+        st.subheader("👥 How You Compare")
+        labels = {"overall": "All users", "age_band": "Age", "job_stability": "Job", "primary_bank": "Bank"}
+        for column, (name, ranking) in zip(st.columns(len(peer_ranks)), peer_ranks.items()):
+            with column:
+                title = labels[name] if name == "overall" else f"{labels[name]}: {ranking['cohort']}"
+                st.metric(title, f"Top {100 - ranking['credit_score']:.0f}%",
+                          delta=f"Health above {ranking['health_score']:.0f}% of {ranking['peers']:,}",
+                          delta_color="off")
+
+    # Rolling trend statistics, kept up to date on every save
+    trends = analysis.get("trends")
+    if trends and trends["snapshot_count"] > 1:
+        st.subheader("📉 Debt Trend")
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Average Debt (EMA)", f"₹{trends['debt_ema']:,.0f}", delta=trends["direction"])
+
+        with col2:
+            st.metric("Payoff Velocity", f"₹{trends['payoff_velocity_per_month']:,.0f}/month",
+                      delta=f"±₹{trends['loan_change_volatility']:,.0f} volatility", delta_color="off")
+
+        with col3:
+            st.metric("Utilization Trend", f"{trends['utilization_slope_per_month']:+.1f}%/month",
+                      delta="✅ Falling" if trends["utilization_slope_per_month"] <= 0 else "⚠️ Rising")
+
+        with col4:
+            st.metric("Projected Debt-Free", trends["projected_debt_free_date"] or "Not on track")
+
+def build_report(job, user_data, credit_score, trend, financial_health, history, advisor):
+    """Background job: the AI plan (published section by section) and the PDF report"""
+    with span("ai_recommendation"):
+        for section in stream_ai_recommendation(credit_score, trend, financial_health, user_data, history, advisor):
+            job.publish(section)
+    ai_recommendation = job.partial_text()
+
+    # Generate chart (PNG bytes, rendered in memory)
+    with span("create_chart"):
+        chart_png = create_chart(user_data, history)
+
+    # Generate PDF with AI recommendations
+    report = dict(financial_health, trend=trend, ai_recommendation=ai_recommendation)
+    with span("create_pdf"):
+        pdf_bytes = render_pdf(credit_score, report, chart_png)
+    return {"ai_recommendation": ai_recommendation, "pdf_bytes": pdf_bytes}
+
+def run_analysis(user_id, user_data, advisor):
+    """Score synchronously and queue the AI plan and PDF as a background job"""
+    with trace(), span("analyze"):
+        # Save user data
+        with span("save_user_data"):
+            save_user_data(user_id, user_data)
+
+        # Trend comes from the O(1) summary rollup; history only needs the charted columns,
+        # and only the newest snapshots, so the read stays bounded however long the history grows
+        with span("get_user_history"):
+            summary = get_user_summary(user_id)
+            history = get_user_history(user_id, limit=CHART_HISTORY_LIMIT, columns=("timestamp", "loan_amount"))
+            trends = get_user_trend(user_id)
+
+        # Calculate financial health
+        with span("calculate_financial_health"):
+            credit_score, trend, financial_health = calculate_financial_health(user_data, history, summary)
+        with span("evaluate_credit_profile"):
+            rules_output = evaluate_credit_profile(user_data, credit_score)
+
+        # save_user_data moved this user's entry in the score distributions; rank against everyone else
+        with span("peer_rank"):
+            peer_ranks = peer_percentiles(user_data, credit_score, financial_health["health_score"])
+
+        # The slow part runs in the shared worker pool, so it survives the user navigating away;
+        # its spans stay in this trace
+        job_id = get_job_manager().submit(user_id, "report", build_report, user_data, credit_score, trend,
+                                          financial_health, history, advisor)
+
+    return {
+        "user_data": user_data,
+        "credit_score": credit_score,
+        "financial_health": financial_health,
+        "rules_output": rules_output,
+        "trends": trends,
+        "peer_ranks": peer_ranks,
+        "job_id": job_id,
+        "ai_recommendation": None,
+        "pdf_bytes": None,
+    }
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_report(job_id):
+    """Re-render only this block while the job runs; rerun the page once it has finished"""
+    job = get_job_manager().get(job_id)
+    if job is None or job.status in (DONE, FAILED):
+        st.rerun()
+
+    st.subheader("🤖 AI Recommendation")
+    st.caption(f"🤖 AI analyzing your financial profile... ({job.status})")
+    with st.container(border=True):
+        st.markdown(job.partial_text() or "Waiting for the AI models...")
+
+def show_report(analysis):
+    """AI plan and PDF download, filled in from the background job when it completes"""
+    if analysis["pdf_bytes"] is None:
+        job = get_job_manager().get(analysis["job_id"])
+        if job is None:
+            st.warning("Your AI report has expired. Please analyze again.")
+            return
+        if job.status == FAILED:
+            st.error(f"Error generating your AI report: {job.error}. Please try again.")
+            return
+        if job.status != DONE:
+            poll_report(job.id)
+            return
+        analysis.update(job.result)
+
+    st.subheader("🤖 AI Recommendation")
+    st.info(analysis["ai_recommendation"])
+
+    st.download_button(
+        "📥 Download AI Financial Report",
+        analysis["pdf_bytes"],
+        file_name="ai_credit_health_report.pdf",
+        mime="application/pdf"
+    )
 
 def main():
     st.set_page_config(page_title="AI Credit Planner", layout="wide")
     st.title("🤖 AI-Powered Credit Health Analyzer")
     st.markdown("*Get personalized financial advice powered by AI*")
 
-    # Initialize database
-    init_db()
+    # Process-wide resources, created once rather than on every rerun
+    get_database()
+    get_market_data()
+    advisor = get_advisor()
+    start_metrics_server()
 
     # User ID for demo (in production, use auth)
     user_id = st.text_input("Enter User ID (e.g., email or phone)", value="test_user")
@@ -23,67 +191,28 @@ def main():
         submitted = st.form_submit_button("🚀 Analyze with AI")
 
     if submitted and user_data:
-        try:
-            # Show AI processing
-            with st.spinner("🤖 AI analyzing your financial profile..."):
-                # Save user data
-                save_user_data(user_id, user_data)
-
-                # Load history
-                history = get_user_history(user_id)
-
-                # Calculate financial health
-                credit_score, trend, financial_health = calculate_financial_health(user_data, history)
-                rules_output = evaluate_credit_profile(user_data, credit_score)
-
-                # Enhanced AI recommendation
-                ai_recommendation = get_ai_recommendation(credit_score, trend, financial_health, user_data, history)
-
-            # Generate chart
-            chart_path = create_chart(user_data, history)
-
-            # Show insights and dashboard
-            show_insights(credit_score, rules_output, ai_recommendation)
-            show_dashboard(user_data, credit_score, rules_output)
-
-            # Enhanced metrics
-            st.subheader("📊 Financial Health Summary")
-            col1, col2, col3, col4 = st.columns(4)
-
-            with col1:
-                st.metric("Credit Score", f"{credit_score}/900",
-                          delta="Excellent" if credit_score >= 750 else "Good" if credit_score >= 650 else "Needs Work")
-
-            with col2:
-                debt_ratio = user_data['loan_amount'] / max(user_data['income'], 1)
-                st.metric("Debt Ratio", f"{debt_ratio:.1%}",
-                          delta="✅ Healthy" if debt_ratio < 0.4 else "⚠️ High")
-
-            with col3:
-                # Use get() with fallback to avoid KeyError
-                risk_profile = financial_health.get('risk_profile', 'Moderate')
-                st.metric("Health Score", f"{financial_health['health_score']}/100",
-                          delta=risk_profile)
-
-            with col4:
-                surplus = user_data['income'] - user_data['expenses']
-                st.metric("Monthly Surplus", f"₹{surplus:,.0f}",
-                          delta="Good" if surplus > 5000 else "Tight" if surplus > 0 else "Deficit")
-
-            # Generate PDF with AI recommendations
-            financial_health["trend"] = trend
-            financial_health["ai_recommendation"] = ai_recommendation
-            pdf_path = create_pdf(credit_score, financial_health, chart_path)
-
-            with open(pdf_path, "rb") as f:
-                st.download_button(
-                    "📥 Download AI Financial Report",
-                    f,
-                    file_name="ai_credit_health_report.pdf",
-                    mime="application/pdf"
-                )
-        except Exception as e:
-            st.error(f"Error processing your request: {str(e)}. Please check your inputs and try again.")
+        key = analysis_key(user_id, user_data)
+        if get_session_analysis(key) is None:
+            try:
+                analysis = run_analysis(user_id, user_data, advisor)
+            except JobLimitError:
+                st.warning("You already have reports in progress. Please wait for them to finish.")
+                return
+            except Exception as e:
+                st.error(f"Error processing your request: {str(e)}. Please check your inputs and try again.")
+                return
+            store_session_analysis(key, analysis)
+
+    # The score shows immediately; the AI plan and PDF appear when their job completes.
+    # Reruns and resubmits of the same inputs reuse the memoized analysis.
+    analysis = get_session_analysis()
+    if analysis:
+        show_insights(analysis["credit_score"], analysis["rules_output"])
+        show_report(analysis)
+        show_results(analysis)
+
+    # The page is on screen; load the deferred renderers and model clients in the background
+    start_warmup()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,30 +1,124 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-import matplotlib.pyplot as plt
+# matplotlib, reportlab and numpy are imported inside the functions that use them: together
+# they are most of the app's import time and only the report path needs them.
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import CHART_MAX_POINTS, CHART_CACHE_SIZE, PDF_CACHE_SIZE
+import hashlib
+import io
+import json
 import os
 import tempfile
+import threading
+
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+_styles = None
+
+def downsample_lttb(values, threshold):
+    """Indices of at most ``threshold`` points that keep the series' visual shape.
+
+    Largest-Triangle-Three-Buckets: the first and last points are kept, and from each
+    bucket in between the point forming the largest triangle with its neighbours wins.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    import numpy as np
+
+    x = np.arange(n, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    bucket_size = (n - 2) / (threshold - 2)
+
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+
+    selected.append(n - 1)
+    return selected
+
+def render_chart_png(timestamps, loans):
+    """Loan trend chart as PNG bytes, rendered without pyplot's global state and cached by series"""
+    key = hashlib.sha256(repr((list(timestamps), list(loans))).encode("utf-8")).hexdigest()
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.ticker import MaxNLocator
+
+    indices = downsample_lttb(loans, CHART_MAX_POINTS)
+    timestamps = [timestamps[i] for i in indices]
+    loans = [loans[i] for i in indices]
+
+    fig = Figure(figsize=(4, 2))  # Optimized for PDF
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(timestamps, loans, marker='o')
+    ax.set_title("Loan Amount Trend")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Loan Amount (₹)")
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=8))  # Keep date labels legible on long histories
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    png = buffer.getvalue()
+
+    with _chart_cache_lock:
+        _chart_cache[key] = png
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return png
 
 def create_chart(user_data, history, chart_path=None):
+    """Render the loan trend; returns PNG bytes, or writes them and returns chart_path if given"""
+    timestamps = [h["timestamp"] for h in history]
+    loans = [h["loan_amount"] for h in history]
+    png = render_chart_png(timestamps, loans)
     if not chart_path:
-        chart_path = os.path.join(tempfile.gettempdir(), "credit_trend.png")
-    timestamps = [h[7] for h in history]  # timestamp
-    loans = [h[3] for h in history]  # loan_amount
-    plt.figure(figsize=(4, 2))  # Optimized for PDF
-    plt.plot(timestamps, loans, marker='o')
-    plt.title("Loan Amount Trend")
-    plt.xlabel("Date")
-    plt.ylabel("Loan Amount (₹)")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(chart_path, dpi=100)
-    plt.close()
+        return png
+    with open(chart_path, "wb") as f:
+        f.write(png)
     return chart_path
 
-def create_pdf(credit_score, financial_health, chart_path, filename="credit_health_report.pdf"):
-    file_path = os.path.join(tempfile.gettempdir(), filename)
-    doc = SimpleDocTemplate(file_path, pagesize=A4)
-    styles = getSampleStyleSheet()
+def _stylesheet():
+    """Report styles, built once per process and shared by every render"""
+    global _styles
+    if _styles is None:
+        from reportlab.lib.styles import getSampleStyleSheet
+        _styles = getSampleStyleSheet()
+    return _styles
+
+def prime_renderers():
+    """Import matplotlib and reportlab, load the font cache and build the stylesheet ahead of the first report"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(1, 1))
+    FigureCanvasAgg(fig)
+    fig.text(0.5, 0.5, "₹0")
+    fig.canvas.draw()  # Text layout forces the font manager to find and load its fonts
+    _stylesheet()
+
+def _build_story(credit_score, financial_health, chart_png):
+    from reportlab.platypus import Paragraph, Spacer, Image
+
+    styles = _stylesheet()
     story = []
 
     story.append(Paragraph("AI Credit Planner: Financial Health Report", styles["Title"]))
@@ -45,9 +139,63 @@ def create_pdf(credit_score, financial_health, chart_path, filename="credit_heal
     story.append(Paragraph(ai_recommendation, styles["Normal"]))
     story.append(Spacer(1, 20))
 
-    if os.path.exists(chart_path):
+    if chart_png:
         story.append(Paragraph("Your Loan Trend:", styles["Heading2"]))
-        story.append(Image(chart_path, width=400, height=200))
+        story.append(Image(io.BytesIO(chart_png), width=400, height=200))
+
+    return story
+
+def _read_chart(chart):
+    """The chart as PNG bytes, whether given as bytes or as a path to an image file"""
+    if isinstance(chart, (bytes, bytearray)):
+        return bytes(chart)
+    if chart and os.path.exists(chart):
+        with open(chart, "rb") as f:
+            return f.read()
+    return None
+
+def render_pdf(credit_score, financial_health, chart=None):
+    """The report as PDF bytes, built in memory and cached by a hash of its content"""
+    chart_png = _read_chart(chart)
+    content = json.dumps([
+        credit_score,
+        financial_health['health_score'],
+        financial_health.get('risk_profile', 'Moderate'),
+        financial_health['trend'],
+        financial_health.get('ai_recommendation', 'No AI recommendation available'),
+    ], default=str).encode("utf-8")
+    key = hashlib.sha256(content + (chart_png or b"")).hexdigest()
+
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            return _pdf_cache[key]
+
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+
+    buffer = io.BytesIO()
+    # invariant=1 drops the creation date and random ID, so equal content gives equal bytes
+    doc = SimpleDocTemplate(buffer, pagesize=A4, invariant=1)
+    doc.build(_build_story(credit_score, financial_health, chart_png))
+    pdf = buffer.getvalue()
+
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    return pdf
+
+def _render_pdf_job(job):
+    return render_pdf(*job)
+
+def render_pdfs(jobs, workers=None):
+    """Render many (credit_score, financial_health, chart) reports across worker processes"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_pdf_job, jobs, chunksize=8))
 
-    doc.build(story)
-    return file_path
\ No newline at end of file
+def create_pdf(credit_score, financial_health, chart_path, filename="credit_health_report.pdf", output_dir=None):
+    file_path = os.path.join(output_dir or tempfile.gettempdir(), filename)
+    with open(file_path, "wb") as f:
+        f.write(render_pdf(credit_score, financial_health, chart_path))
+    return file_path
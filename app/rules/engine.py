@@ -1,10 +1,148 @@
 # rules/engine.py
 
+import json
+import operator
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+from config.settings import RULES_PATH
+
+if TYPE_CHECKING:
+    import numpy as np  # Imported by the batch functions only: per-profile evaluation never needs it
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _compile_operand(spec: Any) -> Callable[[Any], Any]:
+    """A constant, or {"field": name, "times": k} read from the profile (missing fields are 0)"""
+    if isinstance(spec, dict):
+        field = spec["field"]
+        times = spec.get("times", 1)
+        if times == 1:
+            return lambda row: row.get(field, 0)  # Also works for text fields and None
+        return lambda row: row.get(field, 0) * times
+    return lambda row: spec
+
+
+def _batch_operand(spec: Any, columns: Dict[str, "np.ndarray"], size: int) -> "np.ndarray":
+    """Column counterpart of _compile_operand; non-numeric fields (e.g. job_stability) stay objects"""
+    import numpy as np
+
+    if isinstance(spec, dict):
+        column = columns.get(spec["field"])
+        if column is None:
+            values = np.zeros(size)
+        else:
+            values = np.asarray(column)
+            values = values.astype(np.float64) if values.dtype.kind in "biuf" else values.astype(object)
+        times = spec.get("times", 1)
+        return values if times == 1 else values * times
+    return np.full(size, spec, dtype=object if isinstance(spec, str) else None)
+
+
+class Rule:
+    """A declarative rule compiled once into a per-profile evaluator"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        if spec["op"] not in OPERATORS:
+            raise ValueError(f"Unknown operator in rule {spec.get('name')!r}: {spec['op']}")
+        self.spec = spec
+        self.name = spec["name"]
+        self.compare = OPERATORS[spec["op"]]
+        left = _compile_operand({"field": spec["field"]})
+        right = _compile_operand(spec["value"])
+        self.evaluate = lambda row: bool(self.compare(left(row), right(row)))
+
+    def evaluate_batch(self, columns: Dict[str, "np.ndarray"], size: int) -> "np.ndarray":
+        import numpy as np
+
+        left = _batch_operand({"field": self.spec["field"]}, columns, size)
+        right = _batch_operand(self.spec["value"], columns, size)
+        return np.asarray(self.compare(left, right), dtype=bool)
+
+
+class RuleEngine:
+    """Compiled rule set with per-rule hit counts and timing"""
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        self.rules = [Rule(spec) for spec in specs]
+        self._lock = threading.Lock()
+        self.stats = {rule.name: {"evaluations": 0, "hits": 0, "seconds": 0.0} for rule in self.rules}
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> "RuleEngine":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _record(self, evaluations: int, hits: Dict[str, int], timings: Dict[str, float]):
+        with self._lock:
+            for name, seconds in timings.items():
+                stats = self.stats[name]
+                stats["evaluations"] += evaluations
+                stats["hits"] += hits[name]
+                stats["seconds"] += seconds
+
+    def evaluate(self, user_data: Dict[str, Any], credit_score: int) -> Dict[str, bool]:
+        row = dict(user_data, credit_score=credit_score)
+        results = {}
+        timings = {}
+        for rule in self.rules:
+            start = time.perf_counter()
+            results[rule.name] = rule.evaluate(row)
+            timings[rule.name] = time.perf_counter() - start
+        self._record(1, results, timings)
+        return results
+
+    def evaluate_batch(self, columns: Dict[str, Any], credit_scores: Any) -> Dict[str, "np.ndarray"]:
+        """Evaluate every rule over arrays of profiles; returns one boolean array per rule"""
+        import numpy as np
+
+        columns = dict(columns, credit_score=credit_scores)
+        size = len(np.asarray(credit_scores))
+        results = {}
+        timings = {}
+        for rule in self.rules:
+            start = time.perf_counter()
+            results[rule.name] = rule.evaluate_batch(columns, size)
+            timings[rule.name] = time.perf_counter() - start
+        self._record(size, {name: int(hits.sum()) for name, hits in results.items()}, timings)
+        return results
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-rule hit counts, hit rate and mean evaluation time"""
+        with self._lock:
+            return {
+                name: dict(stats,
+                           hit_rate=stats["hits"] / stats["evaluations"] if stats["evaluations"] else 0.0,
+                           mean_micros=stats["seconds"] / stats["evaluations"] * 1e6 if stats["evaluations"] else 0.0)
+                for name, stats in self.stats.items()
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Rules loaded and compiled once per process"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine.from_file()
+        return _engine
+
+
 def evaluate_credit_profile(user_data: dict, credit_score: int) -> dict:
-    rules = {
-        "Credit score above 700": credit_score > 700,
-        "Has stable income": user_data.get("income", 0) > 25000,
-        "Low expenses ratio": user_data.get("expenses", 0) < 0.5 * user_data.get("income", 0),
-        "Low debt": user_data.get("existing_debt", 0) < 0.3 * user_data.get("income", 0)
-    }
-    return rules
+    return get_rule_engine().evaluate(user_data, credit_score)
+
+
+def evaluate_credit_profiles(columns: Dict[str, Any], credit_scores: Any) -> Dict[str, "np.ndarray"]:
+    """Batch counterpart of evaluate_credit_profile over column arrays"""
+    return get_rule_engine().evaluate_batch(columns, credit_scores)
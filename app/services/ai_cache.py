@@ -0,0 +1,133 @@
+# services/ai_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+from config.settings import AI_CACHE_PATH, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS
+
+
+class _InFlight:
+    """A request currently being computed, shared by every caller asking for the same key"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = ""
+
+
+class PromptCache:
+    """Persistent LRU/TTL cache for AI responses with single-flight request coalescing"""
+
+    def __init__(self, path: str = AI_CACHE_PATH, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = AI_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._db_lock = threading.Lock()
+        self._flight_lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlight] = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, params: Dict) -> str:
+        """Hash of the whitespace-normalized prompt and the model parameters"""
+        normalized = " ".join(prompt.split())
+        raw = json.dumps({"prompt": normalized, "params": params}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute("SELECT response, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, response: str):
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO ai_cache (key, response, created_at, last_access)
+                VALUES (?, ?, ?, ?)
+            """, (key, response, now, now))
+
+            # Evict the least recently used entries once over capacity
+            count = self._conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM ai_cache WHERE key IN (
+                        SELECT key FROM ai_cache ORDER BY last_access ASC LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+            self._conn.commit()
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """Return the cached response, or compute it once for all concurrent callers.
+
+        Empty responses (every model failed) are shared with waiting callers but not stored.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._flight_lock:
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+
+        if not is_leader:
+            flight.event.wait()
+            return flight.result
+
+        try:
+            # Another caller may have filled the cache between our miss and taking the lead
+            cached = self.get(key)
+            if cached is not None:
+                flight.result = cached
+                return cached
+
+            result = compute()
+            if result:
+                self.set(key, result)
+            flight.result = result
+            return result
+        finally:
+            with self._flight_lock:
+                del self._in_flight[key]
+            flight.event.set()
+
+
+_prompt_cache = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Process-wide cache shared by every advisor and Streamlit session"""
+    global _prompt_cache
+    with _prompt_cache_lock:
+        if _prompt_cache is None:
+            _prompt_cache = PromptCache()
+        return _prompt_cache
@@ -0,0 +1,265 @@
+# services/archive.py
+"""Columnar, memory-mapped archive of every user's snapshots for analytics.
+
+An archive is a directory of .npy files, one typed array per column, with rows
+sorted by (user_id, timestamp, id). Each user's history is therefore one contiguous
+slice, found through a sorted ``user_ids`` array and an ``offsets`` index. Columns
+are opened with mmap, so reading a user's history or scanning the whole population
+touches only the pages it needs and copies nothing into Python objects.
+
+    python -m services.archive export snapshot_archive
+    python -m services.archive trend snapshot_archive
+    python -m services.archive history snapshot_archive some_user
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config.settings import DB_PATH, DB_BULK_CHUNK_SIZE, ARCHIVE_PATH
+
+ARCHIVE_VERSION = 1
+
+# Column name -> dtype of the archived array
+ARCHIVE_COLUMNS = {
+    "id": np.int64,
+    "income": np.float64,
+    "expenses": np.float64,
+    "loan_amount": np.float64,
+    "credit_util": np.float64,
+    "missed_payments": np.int32,
+    "timestamp": "datetime64[us]",
+}
+
+
+# ---------------- Export ----------------
+
+def export_archive(path: str = ARCHIVE_PATH, db_path: str = DB_PATH,
+                   chunk_size: int = DB_BULK_CHUNK_SIZE) -> Dict[str, Any]:
+    """Write user_data to a new archive at ``path`` and return its manifest.
+
+    Rows are streamed from SQLite in chunks straight into memory-mapped output
+    arrays, so memory stays flat however large the table is. The archive is built
+    next to ``path`` and swapped in at the end; readers never see a partial one.
+    """
+    from db import get_connection
+
+    conn = get_connection(db_path)
+    build_path = path + ".building"
+    shutil.rmtree(build_path, ignore_errors=True)
+    os.makedirs(build_path)
+    user_ids: List[str] = []
+    offsets: List[int] = []
+
+    # One read transaction, so the count and the rows come from the same WAL snapshot
+    # even while the app or an ingest keeps writing
+    conn.execute("BEGIN")
+    try:
+        rows = conn.execute("SELECT COUNT(*) FROM user_data").fetchone()[0]
+        columns = {name: np.lib.format.open_memmap(os.path.join(build_path, f"{name}.npy"), mode="w+",
+                                                   dtype=dtype, shape=(rows,))
+                   for name, dtype in ARCHIVE_COLUMNS.items()}
+
+        cursor = conn.execute(f"""
+            SELECT user_id, {', '.join(ARCHIVE_COLUMNS)} FROM user_data
+            ORDER BY user_id, timestamp, id
+        """)
+        position = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            end = position + len(chunk)
+            for index, name in enumerate(ARCHIVE_COLUMNS, start=1):
+                values = [row[index] for row in chunk]
+                if name == "timestamp":
+                    # ISO text -> microseconds; NULL or unparsable timestamps become NaT
+                    columns[name][position:end] = np.array(values, dtype="datetime64[us]") \
+                        if all(values) else _parse_timestamps(values)
+                else:
+                    columns[name][position:end] = np.array([0 if value is None else value for value in values])
+
+            for i, row in enumerate(chunk):
+                if not user_ids or row[0] != user_ids[-1]:
+                    user_ids.append(row[0])
+                    offsets.append(position + i)
+            position = end
+    finally:
+        conn.rollback()  # Read-only; ends the snapshot
+
+    offsets.append(position)
+    for column in columns.values():
+        column.flush()
+    del columns
+
+    np.save(os.path.join(build_path, "user_ids.npy"), np.array(user_ids, dtype=str))
+    np.save(os.path.join(build_path, "offsets.npy"), np.array(offsets, dtype=np.int64))
+    manifest = {
+        "version": ARCHIVE_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "rows": position,
+        "users": len(user_ids),
+        "columns": {name: np.dtype(dtype).str for name, dtype in ARCHIVE_COLUMNS.items()},
+    }
+    with open(os.path.join(build_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+        os.replace(build_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(build_path, path)
+    return manifest
+
+
+def _parse_timestamps(values: List[Optional[str]]) -> np.ndarray:
+    parsed = np.empty(len(values), dtype="datetime64[us]")
+    for i, value in enumerate(values):
+        try:
+            parsed[i] = np.datetime64(value, "us") if value else np.datetime64("NaT")
+        except ValueError:
+            parsed[i] = np.datetime64("NaT")
+    return parsed
+
+
+# ---------------- Reading ----------------
+
+class SnapshotArchive:
+    """Read-only view of an exported archive; column arrays are memory-mapped"""
+
+    def __init__(self, path: str = ARCHIVE_PATH):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported archive version {self.manifest['version']} at {path}")
+        self.path = path
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                        for name in self.manifest["columns"]}
+        self.user_ids = np.load(os.path.join(path, "user_ids.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    def _user_slice(self, user_id: str) -> Optional[slice]:
+        index = int(np.searchsorted(self.user_ids, user_id))
+        if index == len(self.user_ids) or self.user_ids[index] != user_id:
+            return None
+        return slice(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+    def history(self, user_id: str, limit: int = None) -> Dict[str, np.ndarray]:
+        """A user's snapshots newest first, as zero-copy views of each column (empty if unknown)"""
+        rows = self._user_slice(user_id) or slice(0, 0)
+        if limit is not None:
+            rows = slice(max(rows.start, rows.stop - limit), rows.stop)
+        return {name: column[rows][::-1] for name, column in self.columns.items()}
+
+    def history_records(self, user_id: str, limit: int = None) -> List[Dict[str, Any]]:
+        """History as newest-first dicts, readable by name like get_user_history rows"""
+        history = self.history(user_id, limit)
+        # datetime.isoformat() reproduces the text save_user_data stored
+        timestamps = [value.isoformat() if value is not None else None
+                      for value in history["timestamp"].astype(object)]
+        numeric = {name: values.tolist() for name, values in history.items() if name != "timestamp"}
+        return [dict({name: values[i] for name, values in numeric.items()}, user_id=user_id,
+                     timestamp=timestamps[i]) for i in range(len(timestamps))]
+
+    def latest(self) -> Dict[str, np.ndarray]:
+        """Every user's newest snapshot, one row per entry of ``user_ids``"""
+        last = self.offsets[1:] - 1
+        return {name: column[last] for name, column in self.columns.items()}
+
+    def loan_changes(self) -> Dict[str, Any]:
+        """Newest-minus-previous loan amount per user with at least two snapshots.
+
+        This is the change behind calculate_financial_health's trend, for everyone at once.
+        """
+        counts = np.diff(self.offsets)
+        has_previous = counts > 1
+        last = self.offsets[1:][has_previous] - 1
+        loans = self.columns["loan_amount"]
+        change = loans[last] - loans[last - 1]
+        return {
+            "user_ids": self.user_ids[has_previous],
+            "change": change,
+            "increased": int((change > 0).sum()),
+            "reduced": int((change < 0).sum()),
+            "stable": int((change == 0).sum()),
+            "no_history": int((~has_previous).sum()),
+        }
+
+    def population_trend(self, period: str = "M") -> Dict[str, np.ndarray]:
+        """Snapshot count and mean loan, utilization, missed payments and debt-to-income per period.
+
+        ``period`` is a numpy datetime unit: "D", "W", "M" or "Y".
+        """
+        timestamps = self.columns["timestamp"]
+        valid = ~np.isnat(timestamps)
+        periods, bucket = np.unique(timestamps[valid].astype(f"datetime64[{period}]"), return_inverse=True)
+        counts = np.bincount(bucket, minlength=len(periods))
+
+        def mean(values):
+            return np.bincount(bucket, weights=values[valid], minlength=len(periods)) / counts
+
+        income = self.columns["income"]
+        debt_to_income = self.columns["loan_amount"] / np.maximum(income, 1)
+        return {
+            "period": periods,
+            "snapshots": counts,
+            "mean_loan_amount": mean(self.columns["loan_amount"]),
+            "mean_credit_util": mean(self.columns["credit_util"]),
+            "mean_missed_payments": mean(self.columns["missed_payments"].astype(np.float64)),
+            "mean_debt_to_income": mean(debt_to_income),
+        }
+
+
+# ---------------- CLI ----------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and query the columnar snapshot archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write user_data to a new archive")
+    export.add_argument("path", nargs="?", default=ARCHIVE_PATH)
+    export.add_argument("--db", default=DB_PATH)
+    export.add_argument("--chunk-size", type=int, default=DB_BULK_CHUNK_SIZE)
+
+    trend = commands.add_parser("trend", help="Population trend per period")
+    trend.add_argument("path", nargs="?", default=ARCHIVE_PATH)
+    trend.add_argument("--period", default="M", choices=["D", "W", "M", "Y"])
+
+    history = commands.add_parser("history", help="One user's snapshots, newest first")
+    history.add_argument("path")
+    history.add_argument("user_id")
+    history.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        start = time.perf_counter()
+        manifest = export_archive(args.path, args.db, args.chunk_size)
+        print(f"Archived {manifest['rows']} snapshots of {manifest['users']} users to {args.path} "
+              f"in {time.perf_counter() - start:.1f}s")
+    elif args.command == "trend":
+        archive = SnapshotArchive(args.path)
+        result = archive.population_trend(args.period)
+        for i, period in enumerate(result["period"]):
+            print(f"{period}  snapshots={result['snapshots'][i]:>9}  loan={result['mean_loan_amount'][i]:>12,.0f}  "
+                  f"util={result['mean_credit_util'][i]:5.1f}%  dti={result['mean_debt_to_income'][i]:.2f}")
+        changes = archive.loan_changes()
+        print(f"Latest change: {changes['increased']} increased, {changes['reduced']} reduced, "
+              f"{changes['stable']} stable, {changes['no_history']} with one snapshot")
+    else:
+        for record in SnapshotArchive(args.path).history_records(args.user_id, args.limit):
+            print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 # REPLACE your app/services/credit_score.py with this COMPLETE AI-powered version:
 
-import requests
 import json
-from typing import Dict, Any, List, Tuple
-import streamlit as st
+from typing import Dict, Any, Iterator, List, Tuple
 from datetime import datetime
 import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import AI_CONCURRENT_MODE, AI_CACHE_ENABLED
+from ai.backends import InferenceBackend, get_default_backend
+from services.ai_cache import PromptCache, get_prompt_cache
+from services.market_data import MarketSnapshot, get_market_store
+from services.telemetry import span
 
 class MarketDataFetcher:
     """Fetch real-time market data for AI recommendations"""
@@ -13,98 +18,46 @@ class MarketDataFetcher:
     @staticmethod
     def get_current_rates() -> Dict[str, Any]:
         """Get current market rates from India"""
-        return {
-            "personal_loan_rates": {
-                "HDFC": {"min": 10.85, "max": 21.0},
-                "ICICI": {"min": 10.60, "max": 21.0},
-                "Axis": {"min": 9.99, "max": 21.0},
-                "SBI": {"min": 11.50, "max": 16.0},
-                "Bajaj": {"min": 10.0, "max": 30.0}
-            },
-            "credit_card_rates": {
-                "average": 36.0,
-                "range": "24% - 48%"
-            },
-            "mutual_funds_2025": {
-                "large_cap": [
-                    {"name": "ICICI Pru Bluechip Fund", "3yr_return": 15.2, "risk": "Low"},
-                    {"name": "Axis Bluechip Fund", "3yr_return": 14.8, "risk": "Low"},
-                    {"name": "Mirae Asset Large Cap Fund", "3yr_return": 14.5, "risk": "Low"}
-                ],
-                "flexi_cap": [
-                    {"name": "Parag Parikh Flexi Cap Fund", "3yr_return": 17.8, "risk": "Moderate"},
-                    {"name": "HDFC Flexi Cap Fund", "3yr_return": 16.2, "risk": "Moderate"},
-                    {"name": "Kotak Flexi Cap Fund", "3yr_return": 15.9, "risk": "Moderate"}
-                ],
-                "debt_funds": [
-                    {"name": "ICICI Pru Short Term Fund", "3yr_return": 7.2, "risk": "Very Low"},
-                    {"name": "Axis Banking & PSU Debt Fund", "3yr_return": 7.8, "risk": "Low"},
-                    {"name": "HDFC Corporate Bond Fund", "3yr_return": 7.5, "risk": "Low"}
-                ]
-            },
-            "fd_rates": {
-                "SBI": 6.8,
-                "HDFC": 7.0,
-                "ICICI": 7.25,
-                "Axis": 7.5
-            }
-        }
+        return get_market_store().current().rates
 
 class AIFinancialAdvisor:
     """Advanced AI Financial Advisor with real market research"""
 
-    def __init__(self):
-        self.market_data = MarketDataFetcher.get_current_rates()
-        # Using multiple AI models for better results
-        self.ai_models = [
-            "https://api-inference.huggingface.co/models/microsoft/DialoGPT-large",
-            "https://api-inference.huggingface.co/models/facebook/blenderbot-400M-distill",
-            "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-        ]
-        self.headers = {"Content-Type": "application/json"}
+    def __init__(self, concurrent: bool = AI_CONCURRENT_MODE, cache: PromptCache = None,
+                 backend: InferenceBackend = None):
+        self.concurrent = concurrent
+        self.cache = cache if cache is not None else (get_prompt_cache() if AI_CACHE_ENABLED else None)
+        self.backend = backend or get_default_backend()
+
+    @property
+    def market(self) -> MarketSnapshot:
+        """Current precomputed, shared snapshot: nothing is rebuilt or rescanned per request"""
+        return get_market_store().current()
+
+    @property
+    def market_data(self) -> Dict[str, Any]:
+        return self.market.rates
 
     def call_ai_with_context(self, prompt: str, max_tokens: int = 300) -> str:
         """Call AI with financial context and market data"""
 
         enhanced_prompt = f"""
-        Current Indian Market Data (August 2025):
-        - Personal Loan Rates: 9.99% - 21% (HDFC: 10.85%, ICICI: 10.60%, Axis: 9.99%)
-        - Credit Card Rates: 24% - 48% (avg 36%)
-        - Best Mutual Funds: Parag Parikh Flexi Cap (17.8% returns), ICICI Bluechip (15.2%)
-        - FD Rates: 6.8% - 7.5%
+        {self.market.prompt_context}
         
         User Query: {prompt}
         
         Provide specific, actionable financial advice using current market data:
         """
 
-        for model_url in self.ai_models:
-            try:
-                payload = {
-                    "inputs": enhanced_prompt,
-                    "parameters": {
-                        "max_new_tokens": max_tokens,
-                        "temperature": 0.8,
-                        "do_sample": True,
-                        "top_p": 0.9
-                    }
-                }
-
-                response = requests.post(model_url, headers=self.headers, json=payload, timeout=20)
-
-                if response.status_code == 200:
-                    result = response.json()
-                    if isinstance(result, list) and len(result) > 0:
-                        ai_text = result[0].get('generated_text', '')
-                        # Clean up the response
-                        ai_text = ai_text.replace(enhanced_prompt, '').strip()
-                        if len(ai_text) > 50:  # Valid response
-                            return ai_text
-
-            except Exception as e:
-                continue
-
-        return ""
+        with span("call_ai_with_context") as current:
+            if self.cache is None:
+                ai_text = self.backend.generate(enhanced_prompt, max_tokens)
+            else:
+                key = PromptCache.make_key(enhanced_prompt, {"max_tokens": max_tokens, **self.backend.describe()})
+                ai_text = self.cache.get_or_compute(key, lambda: self.backend.generate(enhanced_prompt, max_tokens))
+            if not ai_text:
+                current.outcome = "fallback"  # Every model failed or was too short; callers use the template
+            return ai_text
 
     def analyze_user_profile(self, user_data: Dict) -> Dict[str, Any]:
         """Deep analysis of user's financial profile"""
@@ -155,6 +108,8 @@ class AIFinancialAdvisor:
 
     def generate_debt_repayment_strategy(self, user_data: Dict, profile: Dict) -> Dict[str, Any]:
         """AI-powered debt repayment strategy with real market data"""
+        # Imported here: the simulation pulls in numpy, which scoring alone does not need
+        from services.repayment import debts_from_profile, compare_repayment_strategies
 
         loan_amount = user_data.get('loan_amount', 0)
         if loan_amount == 0:
@@ -178,8 +133,11 @@ class AIFinancialAdvisor:
             current_rate = 36.0
 
         # Determine best refinancing option
-        best_personal_loan = min(self.market_data['personal_loan_rates'].items(),
-                                 key=lambda x: x[1]['min'])
+        best_personal_loan = self.market.best_personal_loan
+
+        # Month-by-month avalanche / snowball / refinance comparison across the user's loans
+        strategy_comparison = compare_repayment_strategies(debts_from_profile(user_data, current_rate),
+                                                           best_personal_loan[1]['min'], tenure_months=36)
 
         monthly_payment_3yr = loan_amount * (current_rate/100/12) / (1 - (1 + current_rate/100/12)**(-36))
         monthly_payment_5yr = loan_amount * (current_rate/100/12) / (1 - (1 + current_rate/100/12)**(-60))
@@ -200,7 +158,8 @@ class AIFinancialAdvisor:
                     "total_interest": f"₹{(monthly_payment_5yr * 60) - loan_amount:,.0f}"
                 }
             ],
-            "savings_opportunity": f"₹{((monthly_payment_3yr * 36) - (loan_amount * (1 + best_personal_loan[1]['min']/100 * 3))):,.0f} by refinancing"
+            "savings_opportunity": f"₹{((monthly_payment_3yr * 36) - (loan_amount * (1 + best_personal_loan[1]['min']/100 * 3))):,.0f} by refinancing",
+            "strategy_comparison": strategy_comparison
         }
 
         return strategy
@@ -224,15 +183,13 @@ class AIFinancialAdvisor:
         ai_investment_advice = self.call_ai_with_context(ai_prompt)
 
         # Select funds based on risk profile
+        recommended_funds = self.market.funds_by_risk.get(profile['risk_category'],
+                                                          self.market.funds_by_risk['Moderate'])
         if profile['risk_category'] == 'Conservative':
-            recommended_funds = self.market_data['mutual_funds_2025']['debt_funds'][:2]
             fd_allocation = 0.4
         elif profile['risk_category'] == 'Aggressive':
-            recommended_funds = self.market_data['mutual_funds_2025']['flexi_cap'][:2]
             fd_allocation = 0.1
         else:
-            recommended_funds = (self.market_data['mutual_funds_2025']['large_cap'][:1] +
-                                 self.market_data['mutual_funds_2025']['flexi_cap'][:1])
             fd_allocation = 0.2
 
         # Calculate allocations
@@ -251,13 +208,17 @@ class AIFinancialAdvisor:
                 "conservative": f"₹{investment_capacity * 12 * 1.08:,.0f} (8% p.a.)",
                 "optimistic": f"₹{investment_capacity * 12 * 1.15:,.0f} (15% p.a.)"
             },
-            "best_fd_rate": f"{max(self.market_data['fd_rates'].values())}% at {max(self.market_data['fd_rates'], key=self.market_data['fd_rates'].get)}"
+            "best_fd_rate": self.market.best_fd_rate_text
         }
 
         return plan
 
-def calculate_financial_health(user_data: dict, history: list) -> tuple[int, str, dict]:
-    """Enhanced financial health calculation with AI insights"""
+def calculate_financial_health(user_data: dict, history: list, summary: dict = None) -> tuple[int, str, dict]:
+    """Enhanced financial health calculation with AI insights
+
+    The trend compares against the previous snapshot, read from the user's summary
+    rollup when given and otherwise from the newest-first history rows.
+    """
 
     income = user_data.get("income", 0)
     expenses = user_data.get("expenses", 0)
@@ -293,9 +254,12 @@ def calculate_financial_health(user_data: dict, history: list) -> tuple[int, str
 
     # Trend analysis
     trend = "No historical data available."
-    if history and len(history) > 1:
-        prev_data = history[1]
-        prev_loan = prev_data[3]
+    prev_loan = None
+    if summary and summary["snapshot_count"] > 1:
+        prev_loan = summary["prev_loan_amount"]
+    elif history and len(history) > 1:
+        prev_loan = history[1]["loan_amount"]
+    if prev_loan is not None:
         loan_change = loan_amount - prev_loan
         if loan_change > 0:
             trend = f"Debt increased by ₹{loan_change:.0f} - need action plan"
@@ -316,24 +280,40 @@ def calculate_financial_health(user_data: dict, history: list) -> tuple[int, str
     }
 
 def get_ai_recommendation(credit_score: int, trend: str, financial_health: dict,
-                          user_data: dict = None, history: list = None) -> str:
+                          user_data: dict = None, history: list = None,
+                          advisor: AIFinancialAdvisor = None) -> str:
     """Complete AI-powered financial recommendation with market research"""
+    return "".join(stream_ai_recommendation(credit_score, trend, financial_health, user_data, history, advisor))
+
+def stream_ai_recommendation(credit_score: int, trend: str, financial_health: dict,
+                             user_data: dict = None, history: list = None,
+                             advisor: AIFinancialAdvisor = None) -> Iterator[str]:
+    """Yield the recommendation section by section as soon as each one is ready.
+
+    The profile analysis needs no network and is yielded immediately; the AI-backed
+    sections follow as their model calls finish. Joined, the sections are exactly
+    the text returned by get_ai_recommendation.
+    """
 
     if not user_data:
-        return "Please provide complete user data for AI analysis."
+        yield "Please provide complete user data for AI analysis."
+        return
 
-    # Initialize AI advisor
-    ai_advisor = AIFinancialAdvisor()
+    # Initialize AI advisor (callers may pass a shared one)
+    ai_advisor = advisor or AIFinancialAdvisor()
 
     # Analyze user profile
     profile = ai_advisor.analyze_user_profile(user_data)
 
-    # Generate AI-powered strategies
-    debt_strategy = ai_advisor.generate_debt_repayment_strategy(user_data, profile)
-    investment_plan = ai_advisor.generate_investment_plan(user_data, profile)
+    # Start the AI-powered strategies; both prompts are independent, so run them at the same time
+    executor = ThreadPoolExecutor(max_workers=2 if ai_advisor.concurrent else 1, thread_name_prefix="ai-plan")
+    try:
+        debt_future = executor.submit(contextvars.copy_context().run,
+                                      ai_advisor.generate_debt_repayment_strategy, user_data, profile)
+        investment_future = executor.submit(contextvars.copy_context().run,
+                                            ai_advisor.generate_investment_plan, user_data, profile)
 
-    # Create comprehensive recommendation
-    recommendation = f"""🤖 **AI-Powered Financial Plan** (Based on August 2025 market data)
+        yield f"""🤖 **AI-Powered Financial Plan** (Based on {ai_advisor.market.as_of} market data)
 
 **📊 Your Profile Analysis:**
 • Credit Score: {credit_score}/900
@@ -342,15 +322,25 @@ def get_ai_recommendation(credit_score: int, trend: str, financial_health: dict,
 • Investment Capacity: ₹{profile['investment_capacity']:,.0f}
 • Priority: {profile['priority'].replace('_', ' ').title()}
 
-**💳 AI Debt Repayment Strategy:**
+"""
+
+        debt_strategy = debt_future.result()
+        comparison = debt_strategy.get('strategy_comparison')
+        best_payoff = (f"{comparison[0]['strategy'].title()} (debt-free by {comparison[0]['payoff_date']}, "
+                       f"₹{comparison[0]['total_interest']:,.0f} interest)") if comparison else 'Not applicable'
+        yield f"""**💳 AI Debt Repayment Strategy:**
 {debt_strategy.get('ai_recommendation', 'No specific AI recommendation available')}
 
 • Current debt rate: {debt_strategy.get('current_debt_rate', 'Unknown')}
 • Best refinancing: {debt_strategy.get('refinancing_option', 'Check personal loan rates')}
 • Recommended payment: {debt_strategy.get('repayment_options', [{}])[0].get('monthly_payment', 'Calculate based on debt')}
 • Potential savings: {debt_strategy.get('savings_opportunity', 'Calculate refinancing benefits')}
+• Best payoff strategy: {best_payoff}
 
-**📈 AI Investment Recommendations:**
+"""
+
+        investment_plan = investment_future.result()
+        yield f"""**📈 AI Investment Recommendations:**
 {investment_plan.get('ai_recommendation', 'No specific AI recommendation available')}
 
 • Monthly SIP: {investment_plan.get('monthly_investment', '₹0')}
@@ -358,34 +348,40 @@ def get_ai_recommendation(credit_score: int, trend: str, financial_health: dict,
 • Top funds: {', '.join([f['name'] for f in investment_plan.get('recommended_funds', [])[:2]])}
 • Expected 5-year returns: {investment_plan.get('expected_returns', {}).get('optimistic', 'Calculate based on allocation')}
 
-**🎯 AI Action Plan (Next 30 days):**
 """
+    finally:
+        # Nothing left to wait for if the consumer stopped reading early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    action_plan = "**🎯 AI Action Plan (Next 30 days):**\n"
 
     # Add specific actions based on priority
     if profile['priority'] == 'credit_repair':
-        recommendation += """
+        action_plan += """
 1. Pay all credit card dues immediately (avoid 36% interest)
 2. Reduce credit utilization below 30% this month
 3. Set up auto-pay for all bills
 4. Apply for secured credit card if needed"""
 
     elif profile['priority'] == 'debt_reduction':
-        recommendation += f"""
+        action_plan += f"""
 1. Transfer high-interest debt to {debt_strategy.get('refinancing_option', 'lower rate lender')}
 2. Start emergency fund: ₹{min(5000, profile['surplus']):,.0f}/month
 3. Avoid new credit for 6 months
 4. Consider debt consolidation"""
 
     else:
-        recommendation += f"""
+        action_plan += f"""
 1. Start SIP: {investment_plan.get('monthly_investment', '₹5000')} in recommended funds
 2. Open high-yield savings account: {investment_plan.get('best_fd_rate', '7.5%')}
 3. Increase insurance coverage
 4. Plan for tax-saving investments (ELSS)"""
 
-    recommendation += f"""
+    yield action_plan
 
-**🇮🇳 India-Specific Tips (August 2025):**
+    yield f"""
+
+**🇮🇳 India-Specific Tips ({ai_advisor.market.as_of}):**
 • Use CRED/Payzapp for credit card payments (rewards + CIBIL boost)
 • Best FD rates: {investment_plan.get('best_fd_rate', '7.5% available')}
 • UPI limit increased - use for all bill payments
@@ -396,5 +392,3 @@ def get_ai_recommendation(credit_score: int, trend: str, financial_health: dict,
 • CIBIL (free monthly score)
 • Groww/Zerodha (investment platform)
 """
-
-    return recommendation
\ No newline at end of file
@@ -0,0 +1,45 @@
+# services/deadlines.py
+"""Request deadlines that follow work into thread pools.
+
+The deadline lives in a context variable, so it travels with
+contextvars.copy_context() into the executors the app already uses. Blocking
+code checks ``remaining()`` to skip work nobody is waiting for any more and to
+cap its own timeouts.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# time.monotonic() by which the current request must finish, or None without a deadline
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("credai_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request this work belongs to has run out of time"""
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Give the enclosed work ``seconds`` to finish; an enclosing, earlier deadline still applies"""
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (negative once passed), or None without one"""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def check():
+    """Raise DeadlineExceeded if the current deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
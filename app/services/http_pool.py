@@ -0,0 +1,141 @@
+# services/http_pool.py
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import (AI_HTTP_POOL_SIZE, AI_HEALTH_WINDOW, AI_BREAKER_FAILURE_THRESHOLD,
+                             AI_BREAKER_ERROR_RATE, AI_BREAKER_COOLDOWN_SECONDS)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide session so inference calls reuse pooled keep-alive connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=AI_HTTP_POOL_SIZE, pool_maxsize=AI_HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class EndpointHealth:
+    """Rolling latency/error stats and a circuit breaker for one model URL"""
+
+    def __init__(self, window: int = AI_HEALTH_WINDOW, failure_threshold: int = AI_BREAKER_FAILURE_THRESHOLD,
+                 error_rate_threshold: float = AI_BREAKER_ERROR_RATE,
+                 cooldown_seconds: float = AI_BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def avg_latency(self) -> float:
+        with self._lock:
+            return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def is_available(self) -> bool:
+        """Whether a request could be sent now, without reserving the half-open probe"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown_seconds
+            return not self.probe_in_flight
+
+    def acquire(self) -> bool:
+        """Reserve permission to send a request; only one probe is let through while half-open"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a reservation without a verdict, when the caller stopped waiting for the answer"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self.probe_in_flight = False
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            window_full = len(self.outcomes) == self.outcomes.maxlen
+            error_rate = self.outcomes.count(False) / len(self.outcomes)
+            if (self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold
+                    or (window_full and error_rate >= self.error_rate_threshold)):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+
+class EndpointHealthRegistry:
+    """Health trackers for every model URL, shared across advisors"""
+
+    def __init__(self, **health_options):
+        self.health_options = health_options
+        self._endpoints: Dict[str, EndpointHealth] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> EndpointHealth:
+        with self._lock:
+            if url not in self._endpoints:
+                self._endpoints[url] = EndpointHealth(**self.health_options)
+            return self._endpoints[url]
+
+    def ordered(self, urls: List[str]) -> List[str]:
+        """Available endpoints, fastest observed first; recently failing ones go last"""
+        available = [url for url in urls if self.get(url).is_available()]
+        return sorted(available, key=lambda url: (self.get(url).consecutive_failures, self.get(url).avg_latency))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            url: {"state": health.state, "avg_latency": health.avg_latency, "error_rate": health.error_rate}
+            for url, health in endpoints.items()
+        }
+
+
+_registry = EndpointHealthRegistry()
+
+
+def get_health_registry() -> EndpointHealthRegistry:
+    return _registry
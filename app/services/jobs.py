@@ -0,0 +1,116 @@
+# services/jobs.py
+
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import JOB_WORKERS, JOB_MAX_PER_USER, JOB_RETENTION_SECONDS
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobLimitError(RuntimeError):
+    """The user already has the maximum number of active jobs"""
+
+
+class Job:
+    """A unit of background work, its status and (once finished) its result or error"""
+
+    def __init__(self, user_id: str, kind: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._chunks: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def publish(self, chunk: str):
+        """Make partial output visible to pollers before the job finishes"""
+        with self._lock:
+            self._chunks.append(chunk)
+
+    def partial_text(self) -> str:
+        with self._lock:
+            return "".join(self._chunks)
+
+
+class JobManager:
+    """In-process worker pool with job IDs, status polling and a per-user concurrency cap.
+
+    Jobs belong to the process, not to a Streamlit session, so they keep running when
+    the user navigates away and their results can be picked up on a later rerun.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_jobs_per_user: int = JOB_MAX_PER_USER,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.max_jobs_per_user = max_jobs_per_user
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: str, kind: str, fn: Callable[..., Any], *args, **kwargs) -> str:
+        """Queue ``fn(job, *args, **kwargs)`` and return the new job's ID"""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if job.user_id == user_id and not job.finished)
+            if active >= self.max_jobs_per_user:
+                raise JobLimitError(f"{user_id} already has {active} jobs in progress")
+            job = Job(user_id, kind)
+            self._jobs[job.id] = job
+
+        # Run in a copy of the caller's context so the job's spans join the caller's trace
+        self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[str]:
+        job = self.get(job_id)
+        return job.status if job else None
+
+    def result(self, job_id: str, timeout: float = None) -> Any:
+        """Wait for a job (up to ``timeout`` seconds) and return its result"""
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not job.finished:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} is still {job.status}")
+            time.sleep(0.05)
+        if job.status == FAILED:
+            raise RuntimeError(job.error)
+        return job.result
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,114 @@
+# services/market_data.py
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from config.settings import MARKET_DATA_PATH, MARKET_DATA_RELOAD_SECONDS
+
+
+class MarketSnapshot:
+    """One loaded version of the market data with every derived lookup precomputed.
+
+    Snapshots are never modified after construction, so request handlers can read
+    them without locks while a reload builds the next one.
+    """
+
+    def __init__(self, rates: Dict[str, Any], mtime: float = 0.0):
+        """Raises ValueError if ``rates`` does not have the expected shape"""
+        if not isinstance(rates, dict):
+            raise ValueError(f"Market data must be a JSON object, not {type(rates).__name__}")
+        self.rates = rates
+        self.mtime = mtime
+        try:
+            self._derive()
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError) as e:
+            raise ValueError(f"Malformed market data: {e!r}") from e
+
+    def _derive(self):
+        rates = self.rates
+        self.version = rates.get("version", 0)
+        self.as_of = rates.get("as_of", "")
+
+        loans = rates["personal_loan_rates"]
+        self.best_personal_loan: Tuple[str, Dict[str, float]] = min(loans.items(), key=lambda x: x[1]["min"])
+        self.personal_loan_range = (min(r["min"] for r in loans.values()), max(r["max"] for r in loans.values()))
+
+        fd_rates = rates["fd_rates"]
+        self.best_fd: Tuple[str, float] = max(fd_rates.items(), key=lambda x: x[1])
+        self.best_fd_rate_text = f"{self.best_fd[1]}% at {self.best_fd[0]}"
+        self.fd_range = (min(fd_rates.values()), max(fd_rates.values()))
+
+        funds = rates["mutual_funds_2025"]
+        self.funds_by_risk: Dict[str, List[Dict[str, Any]]] = {
+            "Conservative": funds["debt_funds"][:2],
+            "Aggressive": funds["flexi_cap"][:2],
+            "Moderate": funds["large_cap"][:1] + funds["flexi_cap"][:1],
+        }
+        self.prompt_context = self._render_prompt_context()
+
+    def _render_prompt_context(self) -> str:
+        """Market summary prepended to every AI prompt"""
+        loans = self.rates["personal_loan_rates"]
+        cards = self.rates["credit_card_rates"]
+        funds = self.rates["mutual_funds_2025"]
+        loan_examples = ", ".join(f"{bank}: {r['min']:.2f}%" for bank, r in list(loans.items())[:3])
+        top_funds = sorted((category[0] for category in (funds["flexi_cap"], funds["large_cap"])),
+                           key=lambda f: f["3yr_return"], reverse=True)
+        fund_examples = ", ".join(f"{f['name']} ({f['3yr_return']}% returns)" for f in top_funds)
+        return "\n".join([
+            f"Current Indian Market Data ({self.as_of}):",
+            f"- Personal Loan Rates: {self.personal_loan_range[0]:g}% - {self.personal_loan_range[1]:g}% ({loan_examples})",
+            f"- Credit Card Rates: {cards['range']} (avg {cards['average']:g}%)",
+            f"- Best Mutual Funds: {fund_examples}",
+            f"- FD Rates: {self.fd_range[0]:g}% - {self.fd_range[1]:g}%",
+        ])
+
+
+class MarketDataStore:
+    """Process-wide market data loaded from a JSON file and hot-reloaded when it changes"""
+
+    def __init__(self, path: str = MARKET_DATA_PATH, reload_seconds: float = MARKET_DATA_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._snapshot = self._load()
+        self._checked_at = time.monotonic()
+        self._rejected_mtime = None  # mtime of a file that failed to load, not retried until it changes
+
+    def _load(self) -> MarketSnapshot:
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            return MarketSnapshot(json.load(f), mtime)
+
+    def current(self) -> MarketSnapshot:
+        """The latest snapshot; at most every reload_seconds one caller checks the file's mtime"""
+        if time.monotonic() - self._checked_at >= self.reload_seconds and self._lock.acquire(blocking=False):
+            try:
+                self._checked_at = time.monotonic()
+                mtime = os.path.getmtime(self.path)
+                if mtime not in (self._snapshot.mtime, self._rejected_mtime):
+                    try:
+                        # Swapping the reference is atomic; readers see the old or the new snapshot
+                        self._snapshot = self._load()
+                    except ValueError:  # Also json.JSONDecodeError
+                        self._rejected_mtime = mtime
+                        raise
+            except (OSError, ValueError):
+                pass  # Keep serving the last good snapshot if the file is missing, half-written or malformed
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_market_store() -> MarketDataStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MarketDataStore()
+        return _store
@@ -0,0 +1,176 @@
+# services/peer_rank.py
+"""Percentile ranking of a user's scores against everyone's latest snapshot.
+
+Both scores are bounded integers (credit_score 300-900, health_score 0-100), so each
+distribution is kept as an exact count per possible score: a histogram whose
+cumulative sums give the rank directly. The histograms live in the database, in
+peer_counts, next to each user's current scores in peer_scores:
+
+- db.save_user_data calls record_scores in its own transaction, moving the user's
+  count from the old score to the new one: a handful of single-row upserts.
+- peer_percentiles sums at most a few hundred rows per cohort off the primary key,
+  well under a millisecond, regardless of population size.
+
+Every process (Streamlit, each API worker) therefore ranks against the same,
+committed distributions; there is no per-process copy to go stale.
+Distributions exist overall and per cohort: age band, job_stability and primary_bank.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+from config.settings import DB_PATH, DB_BULK_CHUNK_SIZE
+
+# Metric -> (lowest, highest) possible score
+SCORE_RANGES = {
+    "credit_score": (300, 900),
+    "health_score": (0, 100),
+}
+COHORT_FIELDS = ("age_band", "job_stability", "primary_bank")
+AGE_BANDS = (18, 25, 35, 45, 55, 65)  # Lower bounds; the last band is open-ended
+UNKNOWN = "unknown"
+OVERALL = ("overall", "all")
+
+UPSERT_COUNT_SQL = """
+    INSERT INTO peer_counts (metric, field, value, score, count) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (metric, field, value, score) DO UPDATE SET count = count + excluded.count
+"""
+
+PERCENTILE_SQL = """
+    SELECT COALESCE(SUM(CASE WHEN score < ? THEN count END), 0),
+           COALESCE(SUM(CASE WHEN score = ? THEN count END), 0),
+           COALESCE(SUM(count), 0)
+    FROM peer_counts WHERE metric = ? AND field = ? AND value = ?
+"""
+
+
+def age_band(age: Any) -> str:
+    if age is None:
+        return UNKNOWN
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return UNKNOWN
+    if age < AGE_BANDS[0]:
+        return f"<{AGE_BANDS[0]}"
+    for lower, upper in zip(AGE_BANDS, AGE_BANDS[1:]):
+        if age < upper:
+            return f"{lower}-{upper - 1}"
+    return f"{AGE_BANDS[-1]}+"
+
+
+def cohorts_of(user_data: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """The (field, value) cohorts a profile belongs to, besides the overall population"""
+    return (
+        ("age_band", age_band(user_data.get("age"))),
+        ("job_stability", user_data.get("job_stability") or UNKNOWN),
+        ("primary_bank", user_data.get("primary_bank") or UNKNOWN),
+    )
+
+
+def _clamp(metric: str, score: Any) -> int:
+    low, high = SCORE_RANGES[metric]
+    return min(max(int(score), low), high)
+
+
+def _count_deltas(row: Tuple, step: int) -> List[Tuple]:
+    """peer_counts upserts for one (credit_score, health_score, age_band, job_stability, primary_bank) row"""
+    cohorts = (OVERALL, *zip(COHORT_FIELDS, row[2:]))
+    return [(metric, field, value, score, step)
+            for metric, score in zip(SCORE_RANGES, row[:2]) for field, value in cohorts]
+
+
+def record_scores(conn, user_id: str, user_data: Dict[str, Any]):
+    """Move a user's entry in the distributions to the scores of ``user_data``.
+
+    Called by db.save_user_data inside its transaction. The scores depend only on the
+    profile, so they are computed here rather than passed in.
+    """
+    from services.credit_score import calculate_financial_health
+
+    credit_score, _, financial_health = calculate_financial_health(user_data, [])
+    new = (_clamp("credit_score", credit_score), _clamp("health_score", financial_health["health_score"]),
+           *(value for _, value in cohorts_of(user_data)))
+    old = conn.execute("""
+        SELECT credit_score, health_score, age_band, job_stability, primary_bank FROM peer_scores WHERE user_id = ?
+    """, (user_id,)).fetchone()
+    if old == new:
+        return
+    deltas = _count_deltas(new, 1)
+    if old is not None:
+        deltas += _count_deltas(old, -1)
+    conn.executemany(UPSERT_COUNT_SQL, deltas)
+    conn.execute("INSERT OR REPLACE INTO peer_scores VALUES (?, ?, ?, ?, ?, ?)", (user_id, *new))
+
+
+def peer_percentiles(user_data: Dict[str, Any], credit_score: int, health_score: int,
+                     db_path: str = DB_PATH) -> Dict[str, Any]:
+    """Where the scores rank overall and within each of the profile's cohorts.
+
+    A percentile is the share of peers scoring lower plus half of those scoring the
+    same, so the median user sits at 50. Cohorts without peers report None.
+    """
+    from db import get_connection
+
+    conn = get_connection(db_path)
+    scores = {"credit_score": _clamp("credit_score", credit_score),
+              "health_score": _clamp("health_score", health_score)}
+    result = {}
+    for cohort in (OVERALL, *cohorts_of(user_data)):
+        ranking: Dict[str, Any] = {"cohort": cohort[1]}
+        for metric, score in scores.items():
+            below, same, total = conn.execute(PERCENTILE_SQL, (score, score, metric, *cohort)).fetchone()
+            ranking["peers"] = total
+            ranking[metric] = round(100 * (below + same / 2) / total, 1) if total else None
+        result[cohort[0]] = ranking
+    return result
+
+
+def _apply_grouped_counts(conn, condition: str, parameters: Iterable, step: int):
+    """Add ``step`` times the histogram of the peer_scores rows matching ``condition``"""
+    for metric in SCORE_RANGES:
+        for field, column in (OVERALL[0], f"'{OVERALL[1]}'"), *((field, field) for field in COHORT_FIELDS):
+            conn.execute(f"""
+                INSERT INTO peer_counts (metric, field, value, score, count)
+                SELECT '{metric}', '{field}', {column}, {metric}, {step} * COUNT(*)
+                FROM peer_scores WHERE {condition} GROUP BY 3, 4
+                ON CONFLICT (metric, field, value, score) DO UPDATE SET count = count + excluded.count
+            """, tuple(parameters))
+
+
+def rebuild_peer_scores(conn, condition: str = "1", parameters: Iterable = ()):
+    """Recompute peer_scores and peer_counts from the latest snapshots, inside the caller's transaction.
+
+    ``condition`` is an SQL expression on user_id selecting the users to refresh
+    (everyone by default). Their old contribution is subtracted, their latest
+    snapshots are scored in vectorized chunks, and the new one is added back.
+    """
+    import numpy as np
+    from services.batch_scoring import SCORING_COLUMNS, calculate_financial_health_batch
+
+    parameters = tuple(parameters)
+    _apply_grouped_counts(conn, condition, parameters, -1)
+    conn.execute(f"DELETE FROM peer_scores WHERE {condition}", parameters)
+
+    cursor = conn.execute(f"""
+        SELECT d.user_id, d.income, d.expenses, d.loan_amount, d.credit_util, d.missed_payments,
+               d.age, d.job_stability, d.primary_bank
+        FROM (SELECT latest_id FROM user_summary WHERE {condition}) s JOIN user_data d ON d.id = s.latest_id
+    """, parameters)
+    while True:
+        rows = cursor.fetchmany(DB_BULK_CHUNK_SIZE)
+        if not rows:
+            break
+        columns = {name: np.array([row[i] or 0 for row in rows], dtype=np.float64)
+                   for i, name in enumerate(("income", "expenses", "loan_amount", "credit_util", "missed_payments"),
+                                            start=1)}
+        columns["age"] = np.array([SCORING_COLUMNS["age"] if row[6] is None else row[6] for row in rows],
+                                  dtype=np.float64)
+        columns["job_stability"] = np.array([row[7] for row in rows], dtype=object)
+        scored = calculate_financial_health_batch(columns)
+        conn.executemany("INSERT OR REPLACE INTO peer_scores VALUES (?, ?, ?, ?, ?, ?)", [
+            (row[0], _clamp("credit_score", scored["credit_score"][i]),
+             _clamp("health_score", scored["health_score"][i]),
+             age_band(row[6]), row[7] or UNKNOWN, row[8] or UNKNOWN)
+            for i, row in enumerate(rows)])
+
+    _apply_grouped_counts(conn, condition, parameters, 1)
+    conn.execute("DELETE FROM peer_counts WHERE count = 0")
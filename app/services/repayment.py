@@ -0,0 +1,141 @@
+# services/repayment.py
+
+from datetime import date
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+# Typical annual rates (%) for the loan types offered in the form; home loans are
+# excluded from the form's outstanding debt, so they are not simulated
+DEBT_RATES = {
+    "credit_card": 36.0,
+    "personal_loan": 14.0,
+    "car_loan": 9.5,
+    "education_loan": 10.5,
+}
+
+STRATEGIES = ("avalanche", "snowball", "refinance")
+MAX_MONTHS = 600
+PAID_OFF = 0.01  # Balances below this count as repaid
+
+
+def debts_from_profile(user_data: Dict, default_rate: float) -> List[Dict[str, Any]]:
+    """Split the outstanding debt across the loan types selected in the form.
+
+    The form only records the total, so it is shared equally between the selected
+    types; with no usable types it becomes one debt at ``default_rate``.
+    """
+    loan_amount = user_data.get('loan_amount', 0)
+    loan_types = [t for t in user_data.get('loan_types', []) if t in DEBT_RATES]
+    if not loan_types:
+        return [{"name": "debt", "balance": float(loan_amount), "rate": default_rate}]
+    share = loan_amount / len(loan_types)
+    return [{"name": t, "balance": float(share), "rate": DEBT_RATES[t]} for t in loan_types]
+
+
+def emi(balance, annual_rate, months):
+    """Equal monthly instalment; works on scalars or broadcastable arrays"""
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 100 / 12
+    balance = np.asarray(balance, dtype=np.float64)
+    months = np.asarray(months, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = balance * monthly_rate / (1 - (1 + monthly_rate) ** (-months))
+    return np.where(monthly_rate == 0, balance / months, payment)
+
+
+def _simulate(balances: np.ndarray, rates: np.ndarray, minimums: np.ndarray, budgets: np.ndarray,
+              priority: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Month-by-month payoff of D debts across S scenarios at once.
+
+    balances (D,), rates (D,) annual %, minimums (S, D), budgets (S,). Each month interest
+    accrues, every debt gets its minimum, and whatever is left of the budget (including
+    minimums freed by repaid debts) goes to the debts in ``priority`` order.
+    """
+    scenarios = len(budgets)
+    balance = np.tile(balances.astype(np.float64), (scenarios, 1))
+    monthly_rate = rates / 100 / 12
+    total_interest = np.zeros(scenarios)
+    payoff_month = np.full(scenarios, np.nan)
+
+    for month in range(1, MAX_MONTHS + 1):
+        active = np.isnan(payoff_month)
+        if not active.any():
+            break
+
+        interest = balance * monthly_rate
+        balance += interest
+        total_interest += interest.sum(axis=1)
+
+        payment = np.minimum(minimums, balance)
+        balance -= payment
+        leftover = budgets - payment.sum(axis=1)
+        for k in priority:
+            extra = np.clip(np.minimum(leftover, balance[:, k]), 0, None)
+            balance[:, k] -= extra
+            leftover -= extra
+
+        done = active & (balance.sum(axis=1) < PAID_OFF)
+        payoff_month[done] = month
+
+    return {"payoff_months": payoff_month, "total_interest": total_interest}
+
+
+def simulate_strategies(debts: List[Dict[str, Any]], extra_payments: Sequence[float],
+                        tenures_months: Sequence[int], refinance_rate: float) -> Dict[str, Dict[str, np.ndarray]]:
+    """Compare avalanche, snowball and refinancing over every (tenure, extra payment) scenario.
+
+    The monthly budget of a scenario is the EMI of each debt over the tenure plus the
+    extra payment. Avalanche sends the surplus to the highest rate first, snowball to the
+    smallest balance first, and refinance consolidates everything into one loan at
+    ``refinance_rate`` paid with the same budget. Results have shape
+    (len(tenures_months), len(extra_payments)); payoff_months is NaN where the budget
+    never clears the debt within MAX_MONTHS.
+    """
+    balances = np.array([d["balance"] for d in debts], dtype=np.float64)
+    rates = np.array([d["rate"] for d in debts], dtype=np.float64)
+    tenure_grid, extra_grid = np.meshgrid(np.asarray(tenures_months, dtype=np.float64),
+                                          np.asarray(extra_payments, dtype=np.float64), indexing="ij")
+    shape = tenure_grid.shape
+    tenures = tenure_grid.ravel()
+    extras = extra_grid.ravel()
+
+    minimums = emi(balances[None, :], rates[None, :], tenures[:, None])
+    budgets = minimums.sum(axis=1) + extras
+
+    orders = {
+        "avalanche": np.argsort(-rates, kind="stable"),
+        "snowball": np.argsort(balances, kind="stable"),
+    }
+    results = {name: _simulate(balances, rates, minimums, budgets, order) for name, order in orders.items()}
+
+    # One consolidated loan; the whole budget goes to it, so its minimum is the budget itself
+    refinance_balance = np.array([balances.sum()])
+    results["refinance"] = _simulate(refinance_balance, np.array([refinance_rate]), budgets[:, None],
+                                     budgets, [0])
+
+    return {name: {key: values.reshape(shape) for key, values in result.items()}
+            for name, result in results.items()}
+
+
+def payoff_date(months: float, start: date = None) -> str:
+    """Month name and year a debt is cleared, counting from ``start`` (today by default)"""
+    if np.isnan(months):
+        return "Not within 50 years"
+    start = start or date.today()
+    total = start.month - 1 + int(months)
+    return date(start.year + total // 12, total % 12 + 1, 1).strftime("%b %Y")
+
+
+def compare_repayment_strategies(debts: List[Dict[str, Any]], refinance_rate: float,
+                                 tenure_months: int = 36, extra_payment: float = 0) -> List[Dict[str, Any]]:
+    """Payoff date and total interest for each strategy in a single scenario, best first"""
+    results = simulate_strategies(debts, [extra_payment], [tenure_months], refinance_rate)
+    comparison = [
+        {
+            "strategy": name,
+            "payoff_months": float(results[name]["payoff_months"][0, 0]),
+            "payoff_date": payoff_date(results[name]["payoff_months"][0, 0]),
+            "total_interest": float(results[name]["total_interest"][0, 0]),
+        }
+        for name in STRATEGIES
+    ]
+    return sorted(comparison, key=lambda c: c["total_interest"])
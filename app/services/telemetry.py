@@ -0,0 +1,173 @@
+# services/telemetry.py
+
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from config.settings import (TELEMETRY_ENABLED, TELEMETRY_JSON_LOGS, METRICS_HOST, METRICS_PORT,
+                             LATENCY_BUCKETS_SECONDS)
+
+logger = logging.getLogger("credai.trace")
+if TELEMETRY_JSON_LOGS and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# The trace a span belongs to; copied into worker threads with contextvars.copy_context()
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("credai_trace_id", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set, in the Prometheus data model"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS_SECONDS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], List] = {}  # labels -> [bucket counts, count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Dict[str, str]):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1  # Made cumulative when rendered
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), count, total) for key, (counts, count, total) in self._series.items()}
+        for key, (counts, count, total) in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+SPAN_DURATION = Histogram("credai_span_duration_seconds",
+                          "Duration of instrumented pipeline stages and model attempts, by outcome")
+
+
+class Span:
+    """A timed stage; set ``outcome`` (default "success") to tag how it ended"""
+
+    __slots__ = ("name", "labels", "outcome", "trace_id", "started", "duration")
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.outcome = "success"
+        self.trace_id = _trace_id.get()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        SPAN_DURATION.observe(self.duration, {"span": self.name, "outcome": self.outcome, **self.labels})
+        if TELEMETRY_JSON_LOGS and logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "ts": time.time(),
+                "trace_id": self.trace_id,
+                "span": self.name,
+                "outcome": self.outcome,
+                "duration_ms": round(self.duration * 1000, 3),
+                **self.labels,
+            }))
+
+
+class _NoopSpan:
+    outcome = "success"
+    duration = 0.0
+
+
+@contextmanager
+def span(name: str, **labels: str) -> Iterator[Span]:
+    """Time the enclosed block; an exception escaping it is recorded as outcome "error".
+
+    Labels become Prometheus labels, so keep their values to small fixed sets.
+    """
+    if not TELEMETRY_ENABLED:
+        yield _NoopSpan()
+        return
+    current = Span(name, labels)
+    try:
+        yield current
+    except BaseException:
+        current.outcome = "error"
+        raise
+    finally:
+        current.finish()
+
+
+@contextmanager
+def trace(trace_id: str = None) -> Iterator[str]:
+    """Group the spans of one request under a trace ID (generated if not given)"""
+    token = _trace_id.set(trace_id or uuid.uuid4().hex)
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(SPAN_DURATION.render()) + "\n"
+
+
+# ---------------- /metrics endpoint ----------------
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve GET /metrics on a daemon thread, once per process; no-op when port is 0"""
+    global _metrics_server
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = render_metrics().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+        return _metrics_server
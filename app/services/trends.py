@@ -0,0 +1,149 @@
+# services/trends.py
+"""Rolling per-user trend statistics, updated in O(1) per snapshot.
+
+The state is a flat dict of numbers, persisted as one user_trends row per user by
+db.save_user_data. Each new snapshot folds into it without re-reading history:
+
+- debt_ema: exponential moving average of loan_amount
+- velocity_ema: EMA of loan change per day (negative = paying down)
+- util_slope_ema: EMA of credit utilization change per day
+- missed_ema: EMA of missed payments
+- change_mean / change_m2: Welford running mean and sum of squares of the
+  per-snapshot loan changes, giving their volatility
+
+Rates are per day, with snapshots less than a day apart counted as one day apart,
+so quick resubmits do not blow up the velocity. Timestamps are compared in the
+stored convention, naive local time (see normalize_timestamp).
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from config.settings import TREND_EMA_ALPHA
+
+TREND_FIELDS = ("snapshot_count", "last_timestamp", "last_loan_amount", "last_credit_util", "debt_ema",
+                "velocity_ema", "util_slope_ema", "missed_ema", "change_mean", "change_m2")
+
+MIN_INTERVAL_DAYS = 1.0
+MAX_PROJECTION_DAYS = 365 * 50  # Slower payoff than this is reported as no projected date
+
+
+def normalize_timestamp(timestamp: Any) -> str:
+    """ISO text in the stored convention, naive local time like datetime.now().isoformat().
+
+    Offset-aware values are converted to local time, so every stored timestamp can be
+    subtracted from and compared with every other. Raises ValueError if not ISO 8601.
+    """
+    return _parse(timestamp).isoformat()
+
+
+def _parse(timestamp: Any) -> datetime:
+    """The timestamp as a naive local datetime (see normalize_timestamp)"""
+    parsed = datetime.fromisoformat(str(timestamp))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _ema(previous: Optional[float], value: float, alpha: float) -> float:
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+def update_trend(state: Optional[Dict[str, Any]], loan_amount: float, credit_util: float,
+                 missed_payments: float, timestamp: str, alpha: float = TREND_EMA_ALPHA) -> Dict[str, Any]:
+    """The state after one more snapshot (``state`` is None for a user's first one).
+
+    Snapshots are expected oldest first. One older than the newest seen so far is
+    still counted, but the last_* fields keep describing the newest snapshot; replay
+    the user's history to place it exactly.
+    """
+    current = _parse(timestamp)
+    timestamp = current.isoformat()
+    loan_amount = float(loan_amount or 0)
+    credit_util = float(credit_util or 0)
+    missed_payments = float(missed_payments or 0)
+
+    if not state or not state["snapshot_count"]:
+        return {
+            "snapshot_count": 1,
+            "last_timestamp": timestamp,
+            "last_loan_amount": loan_amount,
+            "last_credit_util": credit_util,
+            "debt_ema": loan_amount,
+            "velocity_ema": None,
+            "util_slope_ema": None,
+            "missed_ema": missed_payments,
+            "change_mean": 0.0,
+            "change_m2": 0.0,
+        }
+
+    last = _parse(state["last_timestamp"])  # Rows stored before normalization may carry an offset
+    elapsed = current - last
+    newest = elapsed.total_seconds() >= 0
+    days = max(abs(elapsed.total_seconds()) / 86400, MIN_INTERVAL_DAYS)
+    change = loan_amount - state["last_loan_amount"]
+
+    # Welford: running mean and M2 of the loan changes seen so far
+    changes = state["snapshot_count"]  # Changes after this snapshot
+    delta = change - state["change_mean"]
+    change_mean = state["change_mean"] + delta / changes
+    change_m2 = state["change_m2"] + delta * (change - change_mean)
+
+    return {
+        "snapshot_count": state["snapshot_count"] + 1,
+        "last_timestamp": timestamp if newest else last.isoformat(),
+        "last_loan_amount": loan_amount if newest else state["last_loan_amount"],
+        "last_credit_util": credit_util if newest else state["last_credit_util"],
+        "debt_ema": _ema(state["debt_ema"], loan_amount, alpha),
+        "velocity_ema": _ema(state["velocity_ema"], change / days, alpha),
+        "util_slope_ema": _ema(state["util_slope_ema"], (credit_util - state["last_credit_util"]) / days, alpha),
+        "missed_ema": _ema(state["missed_ema"], missed_payments, alpha),
+        "change_mean": change_mean,
+        "change_m2": change_m2,
+    }
+
+
+def replay(snapshots: Iterable, alpha: float = TREND_EMA_ALPHA) -> Optional[Dict[str, Any]]:
+    """Fold oldest-first (loan_amount, credit_util, missed_payments, timestamp) tuples into a state"""
+    state = None
+    for loan_amount, credit_util, missed_payments, timestamp in snapshots:
+        state = update_trend(state, loan_amount, credit_util, missed_payments, timestamp, alpha)
+    return state
+
+
+def describe_trend(state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Readable trend analytics from a stored state, or None without any snapshots"""
+    if not state or not state["snapshot_count"]:
+        return None
+
+    changes = state["snapshot_count"] - 1
+    velocity = state["velocity_ema"]
+    loan_amount = state["last_loan_amount"]
+
+    debt_free_date = None
+    if loan_amount <= 0:
+        debt_free_date = state["last_timestamp"][:10]
+    elif velocity is not None and velocity < 0 and loan_amount / -velocity <= MAX_PROJECTION_DAYS:
+        projected = datetime.fromisoformat(state["last_timestamp"]) + timedelta(days=loan_amount / -velocity)
+        debt_free_date = projected.date().isoformat()
+
+    if velocity is None:
+        direction = "insufficient history"
+    elif velocity < 0:
+        direction = "paying down"
+    elif velocity > 0:
+        direction = "accumulating"
+    else:
+        direction = "flat"
+
+    return {
+        "snapshot_count": state["snapshot_count"],
+        "debt_ema": round(state["debt_ema"], 2),
+        "payoff_velocity_per_month": None if velocity is None else round(-velocity * 30, 2),
+        "utilization_slope_per_month": (None if state["util_slope_ema"] is None
+                                        else round(state["util_slope_ema"] * 30, 2)),
+        "missed_payments_ema": round(state["missed_ema"], 2),
+        "loan_change_volatility": round(math.sqrt(state["change_m2"] / (changes - 1)), 2) if changes > 1 else 0.0,
+        "direction": direction,
+        "projected_debt_free_date": debt_free_date,
+    }
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import streamlit as st
+from config.settings import DB_PATH
+from db import init_db
+from services.credit_score import AIFinancialAdvisor
+from services.market_data import get_market_store
+from services.jobs import JobManager
+
+
+@st.cache_resource
+def get_database():
+    """Migrate the schema once per server process instead of on every rerun"""
+    init_db(DB_PATH)
+    return DB_PATH
+
+
+@st.cache_resource
+def get_advisor() -> AIFinancialAdvisor:
+    """One advisor (and with it the inference backend and prompt cache) for every session"""
+    return AIFinancialAdvisor()
+
+
+@st.cache_resource
+def get_market_data():
+    """Load the market data file once; the store hot-reloads it by itself"""
+    return get_market_store()
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Worker pool shared by all sessions, so jobs outlive the page that started them"""
+    return JobManager()
+
+
+def analysis_key(user_id: str, user_data: dict) -> str:
+    """Stable hash of the form inputs an analysis was computed from"""
+    raw = json.dumps([user_id, user_data], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_session_analysis(key: str = None):
+    """This session's last analysis; with a key, only if it was computed from the same inputs"""
+    cached = st.session_state.get("analysis")
+    if cached and (key is None or cached["key"] == key):
+        return cached["result"]
+    return None
+
+
+def store_session_analysis(key: str, result: dict):
+    st.session_state["analysis"] = {"key": key, "result": result}
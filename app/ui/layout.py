@@ -1,6 +1,7 @@
 import streamlit as st
 
-def show_insights(credit_score, rules_output, ai_recommendation):
+def show_insights(credit_score, rules_output):
+    """Score and rule results; the AI recommendation is rendered by main.show_report as its job completes"""
     st.subheader("📊 Credit Score Summary")
     st.metric("Credit Score", f"{credit_score} / 1000")
 
@@ -8,9 +9,6 @@ def show_insights(credit_score, rules_output, ai_recommendation):
     for rule, status in rules_output.items():
         st.write(f"**{rule}**: {status}")
 
-    st.subheader("🤖 AI Recommendation")
-    st.info(ai_recommendation)
-
 def show_dashboard(user_data, credit_score, rules_output):
     st.subheader("📈 Credit Dashboard")
 
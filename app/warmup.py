@@ -0,0 +1,125 @@
+"""Background warm-up and import-time report.
+
+The heavy dependencies (matplotlib, reportlab, requests, numpy and, for the local
+backend, torch/transformers) are imported lazily on the code path that needs them.
+``start_warmup()`` pays those costs on a background thread once the first page has
+been served, so the first analysis does not.
+
+Import-time report (each module timed cold, in its own interpreter):
+    python warmup.py
+    python warmup.py --json import_times.json --max-seconds 1.5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+from config.settings import AI_BACKEND, AI_LOCAL_MODEL_PATH, WARMUP_ENABLED
+
+# Modules the app defers, and the app modules whose import cost users wait on
+HEAVY_MODULES = [
+    "numpy",
+    "requests",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_agg",
+    "reportlab.platypus",
+    "reportlab.lib.styles",
+]
+APP_MODULES = [
+    "db",
+    "rules.engine",
+    "services.credit_score",
+    "reports.pdf_generator",
+    "ui.cache",
+    "main",
+]
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+warmup_timings: Dict[str, float] = {}
+
+
+def _timed(name: str, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        # Warm-up is best effort: whatever fails here fails again, visibly, on first real use
+        print(f"Warm-up step {name} failed: {e}", file=sys.stderr)
+    warmup_timings[name] = time.perf_counter() - started
+
+
+def warm_up():
+    """Import and initialise everything the first analysis would otherwise pay for"""
+    from reports.pdf_generator import prime_renderers
+    from services.market_data import get_market_store
+    from rules.engine import get_rule_engine
+
+    _timed("numpy", lambda: __import__("numpy"))  # Repayment simulation, chart downsampling, batch rules
+    _timed("renderers", prime_renderers)
+    _timed("market_data", get_market_store)
+    _timed("rules", get_rule_engine)
+    if AI_BACKEND == "local":
+        from ai.backends import load_local_model
+        _timed("local_model", lambda: load_local_model(AI_LOCAL_MODEL_PATH))
+    else:
+        from services.http_pool import get_http_session
+        _timed("http_session", get_http_session)
+
+
+def start_warmup(enabled: bool = WARMUP_ENABLED):
+    """Run warm_up() once per process on a daemon thread; returns the thread (or None if disabled)"""
+    global _warmup_thread
+    if not enabled:
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+# ---------------- Import-time report ----------------
+
+def measure_import(module: str) -> float:
+    """Seconds to import ``module`` in a fresh interpreter, so nothing is already cached"""
+    code = ("import time; started = time.perf_counter(); import " + module +
+            "; print(time.perf_counter() - started)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=sys.path[0] or None, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def import_report(modules: List[str]) -> Dict[str, float]:
+    return {module: measure_import(module) for module in modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import times of the app's modules")
+    parser.add_argument("modules", nargs="*", help="Modules to time (default: heavy dependencies and app modules)")
+    parser.add_argument("--json", dest="json_path", help="Also write the timings to this JSON file")
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="Exit non-zero if any module takes longer than this to import")
+    args = parser.parse_args()
+
+    timings = import_report(args.modules or HEAVY_MODULES + APP_MODULES)
+    width = max(len(module) for module in timings)
+    for module, seconds in timings.items():
+        print(f"{module:<{width}}  {seconds * 1000:8.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(timings, f, indent=2)
+
+    if args.max_seconds is not None:
+        slow = [module for module, seconds in timings.items() if seconds > args.max_seconds]
+        if slow:
+            print(f"Over {args.max_seconds}s: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
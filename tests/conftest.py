@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+# Settings are read at import time, so point everything at a scratch directory before any
+# app module is imported: the tracked credit_data.db and the working tree stay untouched
+_scratch = tempfile.mkdtemp(prefix="credai-tests-")
+os.environ["CREDAI_DB_PATH"] = os.path.join(_scratch, "credit_data.db")
+os.environ["CREDAI_WARMUP"] = "0"
+os.environ.pop("CREDAI_METRICS_PORT", None)
+os.chdir(_scratch)  # Relative paths such as the AI response cache land here too
+
+sys.path.insert(0, APP_DIR)  # The app imports its modules without a package prefix
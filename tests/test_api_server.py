@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import pytest
+
+from api_server import CreditApi, HttpServer
+from services.credit_score import calculate_financial_health
+
+PROFILE = {"income": 80000, "expenses": 30000, "loan_amount": 200000, "credit_util": 35, "missed_payments": 1,
+           "age": 45, "job_stability": "stable", "primary_bank": "HDFC"}
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = HttpServer(CreditApi(blocking_threads=2))
+    yield server
+    server.api.executor.shutdown()
+
+
+def post(server, path, body):
+    status, _, payload, _ = asyncio.run(
+        server._dispatch("POST", path, {}, json.dumps(body).encode("utf-8")))
+    return status, json.loads(payload)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/v1/score", {"user_data": PROFILE}),
+    ("/v1/score/batch", {"profiles": [PROFILE]}),
+])
+@pytest.mark.parametrize("field, value, message", [
+    ("age", None, "age must be a finite number"),
+    ("age", "x", "age must be a finite number"),
+    ("age", True, "age must be a finite number"),
+    ("age", -1, "age must not be negative"),
+    ("job_stability", 1, "job_stability must be a string"),
+    ("primary_bank", ["HDFC"], "primary_bank must be a string"),
+    ("income", float("inf"), "income must be a finite number"),
+])
+def test_invalid_profile_fields_are_rejected(server, path, body, field, value, message):
+    profile = dict(PROFILE, **{field: value})
+    body = {"user_data": profile} if "user_data" in body else {"profiles": [profile]}
+    status, response = post(server, path, body)
+    assert status == 400
+    assert response["error"].endswith(message)
+
+
+def test_single_and_batch_scores_agree_with_the_scorer(server):
+    without_optional = {field: PROFILE[field] for field in
+                        ("income", "expenses", "loan_amount", "credit_util", "missed_payments")}
+    profiles = [PROFILE, without_optional, dict(PROFILE, job_stability=None, primary_bank=None)]
+
+    status, batch = post(server, "/v1/score/batch", {"profiles": profiles})
+    assert status == 200
+    for profile, result in zip(profiles, batch["results"]):
+        credit_score, _, health = calculate_financial_health(profile, [])
+        assert result["credit_score"] == credit_score
+        assert result["health_score"] == health["health_score"]
+
+        status, single = post(server, "/v1/score", {"user_data": profile})
+        assert status == 200
+        assert single["credit_score"] == credit_score
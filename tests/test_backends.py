@@ -0,0 +1,17 @@
+import builtins
+
+from ai.backends import LocalInferenceBackend
+
+
+def test_local_backend_without_torch_degrades_to_empty_responses(monkeypatch, tmp_path):
+    real_import = builtins.__import__
+
+    def without_torch(name, *args, **kwargs):
+        if name == "torch" or name.startswith(("torch.", "transformers")):
+            raise ImportError(f"No module named {name!r}")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", without_torch)
+    backend = LocalInferenceBackend(model_path=str(tmp_path / "missing-model"))
+    assert backend.generate("Plan my debt", 50) == ""
+    assert backend.generate_batch(["a", "b"], 50) == ["", ""]
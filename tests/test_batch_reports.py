@@ -0,0 +1,27 @@
+import batch_reports
+from db import get_connection, insert_snapshots, refresh_user_summaries, save_user_data
+from services.credit_score import calculate_financial_health
+
+PROFILE = {"income": 90000, "expenses": 40000, "loan_amount": 150000, "credit_util": 20, "missed_payments": 0,
+           "age": 45, "job_stability": "stable", "primary_bank": "SBI"}
+
+
+def test_report_scores_match_the_app_and_peer_scores(tmp_path):
+    db_path = str(tmp_path / "reports.db")
+    save_user_data("with_cohorts", PROFILE, db_path)
+    # Ingested rows carry no cohort fields; every path falls back to the same defaults
+    insert_snapshots([("ingested", 90000, 40000, 150000, 20, 0, "2025-01-01T00:00:00")], db_path)
+    refresh_user_summaries(["ingested"], db_path)
+
+    assert batch_reports.run(db_path, str(tmp_path / "out"), workers=1, chunk_size=10) == 2
+
+    conn = get_connection(db_path)
+    reported = dict(conn.execute("SELECT user_id, credit_score FROM report_results"))
+    ranked = dict(conn.execute("SELECT user_id, credit_score FROM peer_scores"))
+    app_score, _, _ = calculate_financial_health(PROFILE, [])
+    default_score, _, _ = calculate_financial_health(
+        {field: PROFILE[field] for field in batch_reports.SNAPSHOT_FIELDS}, [])
+
+    assert reported["with_cohorts"] == ranked["with_cohorts"] == app_score
+    assert reported["ingested"] == ranked["ingested"] == default_score
+    assert app_score != default_score  # Age and job stability do count
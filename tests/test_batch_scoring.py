@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from services.batch_scoring import calculate_financial_health_batch, random_profiles
+from services.credit_score import calculate_financial_health
+
+
+def profile_at(profiles, i):
+    """The scalar user_data for row ``i``, with native Python values as the form produces"""
+    return {name: column[i].item() if isinstance(column[i], np.generic) else column[i]
+            for name, column in profiles.items()}
+
+
+def assert_matches_scalar(batch, i, user_data):
+    credit_score, _, health = calculate_financial_health(user_data, [])
+    assert credit_score == batch["credit_score"][i]
+    assert health["health_score"] == batch["health_score"][i]
+    assert health["debt_to_income"] == batch["debt_to_income"][i]
+    assert health["risk_profile"] == batch["risk_profile"][i]
+    assert health["risk_factors"] == {name: bool(values[i]) for name, values in batch["risk_factors"].items()}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_equals_scalar_on_random_profiles(seed):
+    profiles = random_profiles(5_000, seed=seed)
+    batch = calculate_financial_health_batch(profiles)
+    for i in range(5_000):
+        assert_matches_scalar(batch, i, profile_at(profiles, i))
+
+
+def test_batch_equals_scalar_at_the_boundaries():
+    profiles = {
+        "income": np.array([0, 1, 100000, 200000, 250000, 50000]),
+        "loan_amount": np.array([0, 5, 50000, 100000, 0, 10 ** 9]),
+        "credit_util": np.array([0, 100, 70, 71, 100, 0]),
+        "missed_payments": np.array([0, 12, 2, 3, 20, 0]),
+        "age": np.array([18, 80, 30, 45, 99, 0]),
+        "job_stability": np.array(["stable", "uncertain", "stable", "new_job", None, "stable"], dtype=object),
+    }
+    batch = calculate_financial_health_batch(profiles)
+    for i in range(6):
+        assert_matches_scalar(batch, i, profile_at(profiles, i))
+
+
+def test_record_array_input_and_missing_columns_use_the_scalar_defaults():
+    records = np.array([(60000.0, 20000.0), (0.0, 1000.0)], dtype=[("income", "f8"), ("loan_amount", "f8")])
+    batch = calculate_financial_health_batch(records)
+    for i, record in enumerate(records):
+        user_data = {"income": record["income"].item(), "loan_amount": record["loan_amount"].item()}
+        assert_matches_scalar(batch, i, user_data)
@@ -0,0 +1,78 @@
+import argparse
+import json
+import sys
+
+import pytest
+
+import benchmarks
+
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["benchmarks.py", *argv])
+    benchmarks.main()
+
+
+def test_measure_warms_up_then_reports_per_call_seconds():
+    calls = []
+    result = benchmarks.measure(calls.append, repeat=3, number=4)
+    assert calls == [-1, *range(12)]  # The warm-up call is not timed; every timed call gets a fresh index
+    assert set(result) == {"median_seconds", "min_seconds", "calls"}
+    assert result["calls"] == 12
+    assert 0 <= result["min_seconds"] <= result["median_seconds"]
+
+
+def test_parse_rows():
+    assert benchmarks.parse_rows("1k, 100k,10m,250") == [1_000, 100_000, 10_000_000, 250]
+
+
+def test_save_writes_a_baseline(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    run_main(monkeypatch, "--stages", "scoring,rules", "--repeat", "1", "--save", str(path))
+
+    saved = json.loads(path.read_text())
+    assert set(saved) == {"created", "python", "machine", "results"}
+    assert set(saved["results"]) == {"calculate_financial_health", "evaluate_credit_profile"}
+    assert all(result["median_seconds"] > 0 for result in saved["results"].values())
+    assert "calculate_financial_health" in capsys.readouterr().out
+
+
+def test_database_stage_reports_each_size(monkeypatch, tmp_path):
+    path = tmp_path / "database.json"
+    run_main(monkeypatch, "--stages", "database", "--rows", "200", "--repeat", "1", "--save", str(path))
+    assert json.loads(path.read_text())["results"]
+
+
+def baseline(tmp_path, factor):
+    """Time the scoring stage once and save it scaled by ``factor`` as a baseline"""
+    results = benchmarks.run(argparse.Namespace(stages="scoring", repeat=1))
+    for result in results["results"].values():
+        result["median_seconds"] *= factor
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(results))
+    return str(path)
+
+
+def test_compare_fails_on_a_regression(monkeypatch, tmp_path, capsys):
+    path = baseline(tmp_path, 0.01)  # A baseline 100x faster than this machine
+    with pytest.raises(SystemExit) as exited:
+        run_main(monkeypatch, "--stages", "scoring", "--repeat", "1", "--compare", path)
+    assert exited.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_compare_passes_within_the_threshold(monkeypatch, tmp_path, capsys):
+    path = baseline(tmp_path, 100)
+    run_main(monkeypatch, "--stages", "scoring", "--repeat", "1", "--compare", path)
+    assert "REGRESSION" not in capsys.readouterr().out
+
+
+def test_compare_reports_stages_missing_from_the_baseline(capsys):
+    current = {"results": {"new_stage": {"median_seconds": 0.001}}}
+    assert benchmarks.compare(current, {"results": {}}, 0.25) == []
+    assert "no baseline" in capsys.readouterr().out
+
+
+def test_unknown_stage_is_rejected(monkeypatch):
+    with pytest.raises(SystemExit) as exited:
+        run_main(monkeypatch, "--stages", "scoring,gpu")
+    assert exited.value.code == 2
@@ -0,0 +1,17 @@
+from db import get_user_history, get_user_history_page, insert_snapshots
+
+
+def test_history_pages_walk_a_temporary_database(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    insert_snapshots([("pager", 50000, 20000, 1000 * i, 30, 0, f"2025-01-{i + 1:02d}T00:00:00") for i in range(7)],
+                     db_path)
+
+    pages, cursor = [], None
+    while True:
+        rows, cursor = get_user_history_page("pager", 3, cursor, columns=("loan_amount",), db_path=db_path)
+        pages.append([row["loan_amount"] for row in rows])
+        if cursor is None:
+            break
+
+    assert pages == [[6000, 5000, 4000], [3000, 2000, 1000], [0]]
+    assert [row["loan_amount"] for row in get_user_history("pager", db_path=db_path)] == sum(pages, [])
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from ai.backends import RemoteInferenceBackend
+from benchmarks import STUB_RESPONSE, StubInferenceServer
+from services.http_pool import CLOSED, HALF_OPEN, OPEN, EndpointHealth, EndpointHealthRegistry, get_http_session
+
+COOLDOWN = 0.2
+
+
+@pytest.fixture
+def registry():
+    return EndpointHealthRegistry(failure_threshold=2, cooldown_seconds=COOLDOWN)
+
+
+def backend(urls, registry, hedged=False, **options):
+    return RemoteInferenceBackend(urls, hedged=hedged, session=get_http_session(), health=registry, **options)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    health = EndpointHealth(failure_threshold=3, cooldown_seconds=60)
+    for _ in range(2):
+        assert health.acquire()
+        health.record_failure(0.1)
+    assert health.state == CLOSED
+    health.record_failure(0.1)
+    assert health.state == OPEN
+    assert not health.acquire()
+    assert not health.is_available()
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    health = EndpointHealth(failure_threshold=1, cooldown_seconds=COOLDOWN)
+    health.record_failure(0.1)
+    assert not health.acquire()
+
+    time.sleep(COOLDOWN)
+    assert health.acquire()
+    assert health.state == HALF_OPEN
+    assert not health.acquire()  # Only one probe at a time
+
+    health.record_success(0.05)
+    assert health.state == CLOSED
+    assert health.acquire()
+
+
+def test_failed_probe_reopens_the_circuit():
+    health = EndpointHealth(failure_threshold=1, cooldown_seconds=COOLDOWN)
+    health.record_failure(0.1)
+    time.sleep(COOLDOWN)
+    assert health.acquire()
+    health.record_failure(0.1)
+    assert health.state == OPEN
+    assert not health.acquire()
+
+
+def test_error_rate_opens_once_the_window_is_full():
+    health = EndpointHealth(window=4, failure_threshold=10, error_rate_threshold=0.5, cooldown_seconds=60)
+    for succeeded in (True, False, True, False):
+        health.record_success(0.1) if succeeded else health.record_failure(0.1)
+    assert health.state == OPEN
+
+
+def test_failing_endpoint_is_skipped_once_open(registry):
+    bad = StubInferenceServer(status=500)
+    with bad as bad_url, StubInferenceServer() as good_url:
+        models = backend([bad_url, good_url], registry)
+        assert STUB_RESPONSE in models.generate("Plan my debt", 50)  # Falls through to the healthy one
+        assert registry.ordered([bad_url, good_url]) == [good_url, bad_url]
+
+        backend([bad_url], registry).generate("Plan my debt", 50)
+        assert registry.get(bad_url).state == OPEN
+        assert registry.ordered([bad_url, good_url]) == [good_url]
+
+        requests_while_open = bad.requests
+        for _ in range(3):
+            assert STUB_RESPONSE in models.generate("Plan my debt", 50)
+        assert bad.requests == requests_while_open
+
+
+def test_open_endpoint_recovers_through_a_half_open_probe(registry):
+    stub = StubInferenceServer(status=500)
+    with stub as url:
+        models = backend([url], registry)
+        for _ in range(2):
+            assert models.generate("Plan my debt", 50) == ""
+        assert registry.get(url).state == OPEN
+
+        requests_while_open = stub.requests
+        assert models.generate("Plan my debt", 50) == ""
+        assert stub.requests == requests_while_open  # Skipped without a network call
+
+        stub.status = 200
+        time.sleep(COOLDOWN)
+        assert STUB_RESPONSE in models.generate("Plan my debt", 50)
+        assert registry.get(url).state == CLOSED
+
+
+def test_healthy_endpoints_are_ordered_by_observed_latency(registry):
+    with StubInferenceServer(latency=0.15) as slow_url, StubInferenceServer() as fast_url:
+        backend([slow_url], registry).generate("warm up", 50)
+        backend([fast_url], registry).generate("warm up", 50)
+        assert registry.ordered([slow_url, fast_url]) == [fast_url, slow_url]
+
+
+def test_hedged_request_answers_from_the_faster_endpoint(registry):
+    slow = StubInferenceServer(latency=1.0)
+    with slow as slow_url, StubInferenceServer() as fast_url:
+        models = backend([slow_url, fast_url], registry, hedged=True, hedge_delay=0.05)
+        start = time.monotonic()
+        assert STUB_RESPONSE in models._call_models_hedged(
+            [slow_url, fast_url], "Plan my debt", {"inputs": "Plan my debt", "parameters": {}})
+        assert time.monotonic() - start < 0.8
+        assert slow.requests == 1
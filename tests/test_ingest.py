@@ -0,0 +1,74 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import get_connection, refresh_user_summaries
+from ingest import ingest_records
+
+START = datetime(2025, 1, 1)
+
+
+def records(count, users, seed, offset_minutes=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield i + 1, {
+            "user_id": f"user{rng.randrange(users)}",
+            "income": rng.randrange(200000),
+            "expenses": rng.randrange(100000),
+            "loan_amount": rng.randrange(1000000),
+            "credit_util": rng.randrange(101),
+            "missed_payments": rng.randrange(13),
+            "timestamp": (START + timedelta(minutes=offset_minutes + rng.randrange(count))).isoformat(),
+        }
+
+
+def rollups(db_path):
+    conn = get_connection(db_path)
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall()
+            for table in ("user_summary", "user_trends", "peer_scores", "peer_counts")}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "ingest.db")
+
+
+def test_chunked_ingest_matches_a_full_rebuild(db_path):
+    report = ingest_records(records(3000, 200, seed=1), chunk_size=250, db_path=db_path)
+    assert report["inserted"] == 3000
+    # A later file with rows older than those stored makes some users replay their history
+    ingest_records(records(1000, 300, seed=2, offset_minutes=-500), chunk_size=250, db_path=db_path)
+    incremental = rollups(db_path)
+
+    refresh_user_summaries(db_path=db_path)
+    rebuilt = rollups(db_path)
+    assert incremental["peer_scores"] == rebuilt["peer_scores"]
+    assert incremental["peer_counts"] == rebuilt["peer_counts"]
+    for table in ("user_summary", "user_trends"):
+        assert len(incremental[table]) == len(rebuilt[table])
+        for before, after in zip(incremental[table], rebuilt[table]):
+            assert before == pytest.approx(after)
+
+
+def test_ingest_cost_does_not_grow_with_stored_history(db_path, monkeypatch):
+    import db
+
+    ingest_records(records(2000, 50, seed=3), chunk_size=500, db_path=db_path)
+    calls = []
+    update_trend = db.update_trend
+    monkeypatch.setattr(db, "update_trend", lambda *args: calls.append(args) or update_trend(*args))
+    ingest_records(records(500, 50, seed=4, offset_minutes=10_000), chunk_size=500, db_path=db_path)
+    assert len(calls) == 500  # One fold per new row, none replaying the 2000 stored ones
+
+
+def test_invalid_rows_are_reported_and_skipped(db_path):
+    rows = [(1, {"user_id": "a", "income": "nan", "expenses": 1, "loan_amount": 1, "credit_util": 1,
+                 "missed_payments": 0}),
+            (2, {"user_id": "a", "income": 1, "expenses": 1, "loan_amount": 1, "credit_util": 101,
+                 "missed_payments": 0}),
+            (3, ValueError("invalid JSON"))]
+    report = ingest_records(rows, db_path=db_path)
+    assert report["inserted"] == 0
+    assert [row_number for row_number, _ in report["errors"]] == [1, 2, 3]
+    assert report["errors"][0][1] == "income must be a finite number"
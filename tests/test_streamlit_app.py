@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import ui.cache
+from ai.backends import RemoteInferenceBackend
+from benchmarks import StubInferenceServer
+from conftest import APP_DIR
+from services.credit_score import AIFinancialAdvisor
+from services.jobs import DONE, FAILED
+
+TIMEOUT = 30
+
+
+@pytest.fixture
+def stub():
+    server = StubInferenceServer()
+    with server:
+        yield server
+
+
+@pytest.fixture
+def created(stub, monkeypatch):
+    """Counts of the process-wide resources created, with the advisor pointed at the stub"""
+    counts = {"database": 0, "advisor": 0}
+    init_db = ui.cache.init_db
+
+    def counting_init_db(path):
+        counts["database"] += 1
+        init_db(path)
+
+    def stub_advisor():
+        counts["advisor"] += 1
+        return AIFinancialAdvisor(cache=None, backend=RemoteInferenceBackend([stub.url], hedged=False))
+
+    monkeypatch.setattr(ui.cache, "init_db", counting_init_db)
+    monkeypatch.setattr(ui.cache, "AIFinancialAdvisor", stub_advisor)
+    st.cache_resource.clear()
+    yield counts
+    st.cache_resource.clear()
+
+
+def submit(app: AppTest) -> AppTest:
+    app.button[0].click()  # The form's "Analyze with AI" submit button
+    return app.run(timeout=TIMEOUT)
+
+
+def wait_for_report(app: AppTest) -> AppTest:
+    job = ui.cache.get_job_manager().get(app.session_state["analysis"]["result"]["job_id"])
+    deadline = time.monotonic() + TIMEOUT
+    while job.status not in (DONE, FAILED) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert job.status == DONE, job.error
+    return app.run(timeout=TIMEOUT)
+
+
+def test_page_renders_without_analysis(created):
+    app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=TIMEOUT).run()
+    assert not app.exception
+    assert not app.metric
+    assert created == {"database": 1, "advisor": 1}
+
+
+def test_resources_are_created_once_across_reruns_and_sessions(created):
+    for _ in range(2):
+        app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=TIMEOUT).run()
+        app.run()
+        assert not app.exception
+    assert created == {"database": 1, "advisor": 1}
+
+
+def test_analysis_is_reused_on_rerun_and_resubmit(created, stub):
+    app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=TIMEOUT).run()
+    app.text_input[0].set_value("apptest_user")
+    submit(app)
+    assert not app.exception
+    assert {metric.label for metric in app.metric} >= {"Credit Score", "Debt Ratio", "Health Score"}
+
+    analysis = app.session_state["analysis"]
+    wait_for_report(app)
+    assert not app.exception
+    assert app.session_state["analysis"]["result"]["pdf_bytes"]
+    requests = stub.requests
+    assert requests > 0
+
+    # Neither a plain rerun nor resubmitting identical inputs recomputes anything
+    app.run()
+    submit(app)
+    assert not app.exception
+    assert app.session_state["analysis"]["key"] == analysis["key"]
+    assert app.session_state["analysis"]["result"]["job_id"] == analysis["result"]["job_id"]
+    assert stub.requests == requests
+    assert created == {"database": 1, "advisor": 1}
+
+
+def test_changed_inputs_start_a_new_analysis(created):
+    app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=TIMEOUT).run()
+    app.text_input[0].set_value("apptest_changes")
+    submit(app)
+    first = app.session_state["analysis"]
+
+    app.slider[0].set_value(80)
+    submit(app)
+    assert not app.exception
+    assert app.session_state["analysis"]["key"] != first["key"]
+    assert app.session_state["analysis"]["result"]["job_id"] != first["result"]["job_id"]